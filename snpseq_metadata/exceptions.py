@@ -35,6 +35,10 @@ class NoSampleSheetDataFoundException(MetadataException):
         self.message = f"No data could be parsed from {samplesheet_path}"
 
 
+class ShardMergeException(MetadataException):
+    pass
+
+
 class SomethingNotRecognizedException(MetadataException):
     thing: ClassVar[str] = "Needle"
     things: ClassVar[str] = "needles"
@@ -82,6 +86,9 @@ class ModelConversionException(MetadataException):
         target: Type,
         reason: Optional[Exception] = None
     ) -> None:
+        self.source = source
+        self.target = target
+        self.reason = reason
         reason = f", reason: {str(reason)}" if reason is not None else ""
         self.message = f"{source.__name__} could not be converted to a suitable " \
                        f"{target.__name__} object{reason}"
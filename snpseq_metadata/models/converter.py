@@ -1,7 +1,18 @@
 
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import importlib.metadata
+import json
 import logging
-from functools import wraps
-from typing import ClassVar, List, Tuple, Type, TypeVar, Optional
+import os
+import pickle
+import threading
+import time
+from functools import lru_cache, wraps
+from types import TracebackType
+from typing import Callable, ClassVar, Dict, Iterable, Iterator, List, Tuple, Type, TypeVar, Optional
 
 from snpseq_metadata.models.ngi_models import (
     NGIMetadataModel,
@@ -48,7 +59,10 @@ from snpseq_metadata.models.lims_models import (
     LIMSApplication,
     LIMSSampleType,
 )
+from snpseq_metadata.models.metadata_model import MetadataModel
 from snpseq_metadata.models.ngi_to_sra_mapping import ModelMapper
+from snpseq_metadata.models.validation import LIMSValidationReport
+from snpseq_metadata.utilities import iter_chunks
 
 from snpseq_metadata.exceptions import (
     LibraryStrategyNotRecognizedException,
@@ -57,7 +71,18 @@ from snpseq_metadata.exceptions import (
 )
 
 LOG = logging.getLogger(__name__)
+
+# the number of LIMS models converted by a worker process at a time
+LIMS_TO_NGI_CHUNK_SIZE = 256
+# the number of NGI models converted by a worker process at a time
+NGI_TO_SRA_CHUNK_SIZE = 256
+# the number of NGI models above which worker processes, if any, are used for the conversion
+NGI_TO_SRA_MIN_PROCESS_SIZE = 1000
 T = TypeVar("T", bound="Converter")
+C = TypeVar("C", bound="SRAConversionCache")
+
+# the conversions memoized within the current batch of a thread, see Converter.ngi_to_sra_many
+_ngi_to_sra_batch = threading.local()
 
 
 # These exceptions are defined here, since this class will know about the different model systems
@@ -69,33 +94,338 @@ class SRAModelConversionException(ModelConversionException):
     pass
 
 
+class ConverterStatistics:
+    """
+    Counts the calls to, the time spent in and the failures of the conversions made by each
+    converter class, in each direction. The total time of a conversion includes the time spent
+    in the conversions it makes in turn, the self time does not. Only the conversions made in
+    this process are counted, i.e. not those made by worker processes.
+
+    The statistics can be updated from several threads.
+
+    Example:
+        with ConverterStatistics.collect() as statistics:
+            sra_experiment_set = Converter.ngi_to_sra(ngi_experiment_set)
+        print(statistics.report())
+    """
+
+    # the statistics being collected, if any. The conversions are only measured while this is set
+    active: ClassVar[Optional["ConverterStatistics"]] = None
+
+    def __init__(self) -> None:
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self.seconds: Dict[Tuple[str, str], float] = {}
+        self.self_seconds: Dict[Tuple[str, str], float] = {}
+        self.failures: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        # the time spent in the nested conversions of each conversion in progress, per thread
+        self._local = threading.local()
+
+    @classmethod
+    @contextlib.contextmanager
+    def collect(cls) -> Iterator["ConverterStatistics"]:
+        statistics = cls()
+        previous = ConverterStatistics.active
+        ConverterStatistics.active = statistics
+        try:
+            yield statistics
+        finally:
+            ConverterStatistics.active = previous
+
+    @contextlib.contextmanager
+    def measure(self, converter: Type["Converter"], direction: str) -> Iterator[None]:
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        failed = False
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            key = (converter.__name__, direction)
+            with self._lock:
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self.seconds[key] = self.seconds.get(key, 0.0) + elapsed
+                self.self_seconds[key] = self.self_seconds.get(key, 0.0) + elapsed - nested
+                self.failures[key] = self.failures.get(key, 0) + int(failed)
+
+    def _keys(self) -> List[Tuple[str, str]]:
+        # the most expensive conversions first
+        return sorted(self.counts, key=lambda k: (-self.self_seconds[k], k))
+
+    def to_json(self) -> List[Dict]:
+        return [
+            {
+                "converter": converter,
+                "direction": direction,
+                "count": self.counts[(converter, direction)],
+                "seconds": self.seconds[(converter, direction)],
+                "self_seconds": self.self_seconds[(converter, direction)],
+                "failures": self.failures[(converter, direction)],
+            }
+            for converter, direction in self._keys()
+        ]
+
+    def report(self) -> str:
+        rows = [
+            f"{'converter':<28}{'direction':<12}{'count':>10}{'seconds':>12}"
+            f"{'self':>12}{'failures':>10}"
+        ]
+        for key in self._keys():
+            converter, direction = key
+            rows.append(
+                f"{converter:<28}{direction:<12}{self.counts[key]:>10}{self.seconds[key]:>12.3f}"
+                f"{self.self_seconds[key]:>12.3f}{self.failures[key]:>10}"
+            )
+        return "\n".join(rows)
+
+
+def _conversion_exception(f, args, ex: Exception) -> ModelConversionException:
+    if f.__name__ == "ngi_to_sra":
+        exception_cls = SRAModelConversionException
+        source_cls = args[0].ngi_model_class
+        target_cls = args[0].sra_model_class
+    elif f.__name__ == "lims_to_ngi":
+        exception_cls = NGIModelConversionException
+        source_cls = args[0].lims_model_class
+        target_cls = args[0].ngi_model_class
+    elif f.__name__ == "lims_to_sra":
+        exception_cls = SRAModelConversionException
+        source_cls = args[0].lims_model_class
+        target_cls = args[0].sra_model_class
+    else:
+        exception_cls = ModelConversionException
+        source_cls = None
+        target_cls = None
+    raised_ex = exception_cls(
+        source=source_cls,
+        target=target_cls,
+        reason=ex,
+    )
+    LOG.debug(raised_ex)
+    return raised_ex
+
+
+@lru_cache(maxsize=None)
+def _code_version() -> Dict[str, Optional[str]]:
+    # the installed version of the package, None if it is run from a source tree, and a digest
+    # of the sources of the models, the converters and the mappings between them. The version
+    # does not change with the code of a source tree or an editable install, the digest does
+    try:
+        package_version = importlib.metadata.version("snpseq_metadata")
+    except importlib.metadata.PackageNotFoundError:
+        package_version = None
+    models_dir = os.path.dirname(os.path.abspath(__file__))
+    hasher = hashlib.sha256()
+    for root, dirs, files in os.walk(models_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                hasher.update(os.path.relpath(path, models_dir).encode("utf-8"))
+                with open(path, "rb") as fh:
+                    hasher.update(fh.read())
+    return {"package_version": package_version, "source_digest": hasher.hexdigest()}
+
+
+class SRAConversionCache:
+    """
+    SRA models converted from NGI models, indexed by a hash of the NGI models. The cache saved
+    by an export lets a later export reuse the conversions of the NGI models that have not
+    changed since, so that only the changed models are converted. Only the entries used by
+    the current export are saved.
+
+    Example:
+        cache = SRAConversionCache.load(previous_export_dir)
+        sra_experiment_set = ConvertExperimentSet.ngi_to_sra(ngi_experiment_set, cache=cache)
+        cache.save(export_dir)
+    """
+
+    file_name: ClassVar[str] = "sra_conversion_cache.pickle"
+    # caches saved with another format version, or by another version of the code whose
+    # conversions may differ, are not reused
+    format_version: ClassVar[int] = 3
+
+    def __init__(self, entries: Optional[Dict[str, SRAMetadataModel]] = None) -> None:
+        self.entries = entries or {}
+        self.used: Dict[str, SRAMetadataModel] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def code_version() -> Dict[str, Optional[str]]:
+        # the version of the code making the conversions, computed once
+        return _code_version()
+
+    @classmethod
+    def load(cls: Type[C], export_dir: str) -> C:
+        # a missing, unreadable or outdated cache is not an error, all models are converted
+        # instead. The cache can not be unpickled if e.g. the SRA model classes have been
+        # regenerated or renamed since it was saved
+        path = os.path.join(export_dir, cls.file_name)
+        try:
+            with open(path, "rb") as fh:
+                cache = pickle.load(fh)
+        except FileNotFoundError:
+            LOG.warning(f"no conversion cache found in {export_dir}, converting all models")
+            return cls()
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as ex:
+            LOG.warning(
+                f"the conversion cache in {export_dir} could not be read, converting all "
+                f"models: {ex}"
+            )
+            return cls()
+        if not isinstance(cache, dict) or \
+                (cache.get("format_version"), cache.get("code_version")) != \
+                (cls.format_version, cls.code_version()):
+            LOG.warning(f"the conversion cache in {export_dir} is outdated, converting all models")
+            return cls()
+        return cls(entries=cache["entries"])
+
+    def save(self, export_dir: str) -> None:
+        # save the cache before the SRA models are modified by the export, e.g. when restricting
+        # the runs to the experiments of a project
+        with open(os.path.join(export_dir, self.file_name), "wb") as fh:
+            pickle.dump(
+                {
+                    "format_version": self.format_version,
+                    "code_version": self.code_version(),
+                    "entries": self.used
+                },
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+
+    @staticmethod
+    def key(ngi_model: NGIMetadataModel) -> str:
+        json_str = json.dumps(
+            [type(ngi_model).__name__, ngi_model.to_json()],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(json_str.encode("utf-8")).hexdigest()
+
+    def ngi_to_sra_many(
+            self,
+            converter: Type["Converter"],
+            ngi_models: Iterable[NGIMetadataModel],
+            **kwargs
+    ) -> List[SRAMetadataModel]:
+        """
+        Convert NGI models to SRA models using a converter, reusing the cached conversions of
+        the NGI models that have not changed. The other models are converted in one batch.
+
+        :param converter: the Converter to convert the NGI models with
+        :param ngi_models: an iterable of NGIMetadataModel objects
+        :param kwargs: additional arguments to Converter.ngi_to_sra_many
+        :return: a list of the converted SRAMetadataModel objects
+        """
+        ngi_models = list(ngi_models)
+        keys = [self.key(ngi_model) for ngi_model in ngi_models]
+        sra_models = [self.used.get(key, self.entries.get(key)) for key in keys]
+        changed = [i for i, sra_model in enumerate(sra_models) if sra_model is None]
+        converted = converter.ngi_to_sra_many([ngi_models[i] for i in changed], **kwargs)
+        for i, sra_model in zip(changed, converted):
+            sra_models[i] = sra_model
+        for key, sra_model in zip(keys, sra_models):
+            self.used[key] = sra_model
+        self.misses += len(changed)
+        self.hits += len(ngi_models) - len(changed)
+        return sra_models
+
+
+class _ConversionContext(threading.local):
+    # whether a conversion is in progress in this thread. The conversions nested in it are made
+    # without any error handling of their own, see catch_exception
+    active = False
+
+
+_conversion_context = _ConversionContext()
+
+
+@contextlib.contextmanager
+def outermost_conversion() -> Iterator[None]:
+    # conversions made within this are outermost conversions, raising a ModelConversionException
+    # when they fail, even if they are nested in another conversion. Use this where the errors
+    # of nested conversions are handled, e.g. to skip the models that could not be converted
+    active = _conversion_context.active
+    _conversion_context.active = False
+    try:
+        yield
+    finally:
+        _conversion_context.active = active
+
+
+def _failed_conversion(f, args, tb: TracebackType) -> Tuple:
+    # the innermost conversion the exception was raised through, i.e. the conversion that would
+    # have built the ModelConversionException if each conversion handled its own errors
+    while tb is not None:
+        if tb.tb_frame.f_code in _CONVERSION_CODES:
+            frame_locals = tb.tb_frame.f_locals
+            f, args = frame_locals["f"], frame_locals["args"]
+        tb = tb.tb_next
+    return f, args
+
+
+def _convert(f, args, kwargs):
+    statistics = ConverterStatistics.active
+    if statistics is not None:
+        with statistics.measure(args[0], f.__name__):
+            return _convert_in_context(f, args, kwargs)
+    return _convert_in_context(f, args, kwargs)
+
+
+def _convert_in_context(f, args, kwargs):
+    if _conversion_context.active:
+        return f(*args, **kwargs)
+    # only the outermost conversion builds the ModelConversionException, for the innermost
+    # conversion the exception was raised through
+    _conversion_context.active = True
+    try:
+        return f(*args, **kwargs)
+    except ModelConversionException:
+        raise
+    except Exception as ex:
+        raise _conversion_exception(*_failed_conversion(f, args, ex.__traceback__), ex) from ex
+    finally:
+        _conversion_context.active = False
+
+
 def catch_exception(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        try:
+        # conversions nested in another conversion take the fast path, unless they are measured
+        if _conversion_context.active and ConverterStatistics.active is None:
             return f(*args, **kwargs)
-        except ModelConversionException:
-            raise
-        except Exception as ex:
-            if f.__name__ == "ngi_to_sra":
-                exception_cls = SRAModelConversionException
-                source_cls = args[0].ngi_model_class
-                target_cls = args[0].sra_model_class
-            elif f.__name__ == "lims_to_ngi":
-                exception_cls = NGIModelConversionException
-                source_cls = args[0].lims_model_class
-                target_cls = args[0].ngi_model_class
-            else:
-                exception_cls = ModelConversionException
-                source_cls = None
-                target_cls = None
-            raised_ex = exception_cls(
-                source=source_cls,
-                target=target_cls,
-                reason=ex,
-            )
-            LOG.debug(raised_ex)
-            raise raised_ex from ex
+        return _convert(f, args, kwargs)
+
+    return wrapper
+
+
+# the code of the frames making conversions, see _failed_conversion. All the wrappers created by
+# catch_exception share the same code
+_CONVERSION_CODES = frozenset([catch_exception(len).__code__, _convert_in_context.__code__])
+
+
+def memoize_in_batch(f):
+    # within a batch conversion, NGI models with identical values are converted once and the
+    # converted object is shared, so this should only be used for value objects that are not
+    # modified after they are converted, e.g. references to a study or an instrument model
+    @wraps(f)
+    def wrapper(cls, ngi_model):
+        memo = getattr(_ngi_to_sra_batch, "memo", None)
+        if memo is None or not ngi_model:
+            return f(cls, ngi_model)
+        key = (cls, type(ngi_model), tuple(vars(ngi_model).items()))
+        if key not in memo:
+            memo[key] = f(cls, ngi_model)
+        return memo[key]
 
     return wrapper
 
@@ -115,6 +445,39 @@ class Converter:
     sra_model_class: ClassVar[Type] = SRAMetadataModel
     lims_model_class: ClassVar[Type] = LIMSMetadataModel
 
+    # the converters to try for a model type, indexed by the model class attribute and the type
+    _converters: ClassVar[Dict[Tuple[str, Type], List[Type["Converter"]]]] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # a new converter may be a candidate for any model type
+        Converter._converters.clear()
+
+    @classmethod
+    def converters_for(
+        cls: Type[T], model_class_attribute: str, model_type: Type
+    ) -> List[Type[T]]:
+        """
+        The converters to try, in order of precedence, for converting a model of a type. These
+        are the subclasses, in order of definition, whose model class is in the MRO of the type.
+        The converters are resolved once per type and then cached.
+
+        :param model_class_attribute: the converter attribute holding the model class to
+        convert from, i.e. "ngi_model_class" or "lims_model_class"
+        :param model_type: the type of the model to convert
+        :return: a list of Converter subclasses
+        """
+        key = (model_class_attribute, model_type)
+        converters = Converter._converters.get(key)
+        if converters is None:
+            converters = [
+                subclass
+                for subclass in Converter.__subclasses__()
+                if issubclass(model_type, getattr(subclass, model_class_attribute))
+            ]
+            Converter._converters[key] = converters
+        return converters
+
     @classmethod
     @catch_exception
     def ngi_to_sra(
@@ -132,11 +495,10 @@ class Converter:
         # iterate over all subclasses to find one whose ngi_nodel_class variable matches the
         # supplied ngi_model, but only if this is called in the base class
         if cls == Converter:
-            for subclass in cls.__subclasses__():
-                if isinstance(ngi_model, subclass.ngi_model_class):
-                    sra_model = subclass.ngi_to_sra(ngi_model=ngi_model)
-                    if sra_model:
-                        return sra_model
+            for subclass in cls.converters_for("ngi_model_class", type(ngi_model)):
+                sra_model = subclass.ngi_to_sra(ngi_model=ngi_model)
+                if sra_model:
+                    return sra_model
             # conversion was unsuccessful, raise the exception
             raise SRAModelConversionException(
                 source=type(ngi_model),
@@ -160,17 +522,163 @@ class Converter:
         # iterate over all subclasses to find one whose lims_nodel_class variable matches the
         # supplied lims_model, but only if this is called in the base class
         if cls == Converter:
-            for subclass in cls.__subclasses__():
-                if isinstance(lims_model, subclass.lims_model_class):
-                    ngi_model = subclass.lims_to_ngi(lims_model=lims_model)
-                    if ngi_model:
-                        return ngi_model
+            for subclass in cls.converters_for("lims_model_class", type(lims_model)):
+                ngi_model = subclass.lims_to_ngi(lims_model=lims_model)
+                if ngi_model:
+                    return ngi_model
             # conversion was unsuccessful, raise the exception
             raise NGIModelConversionException(
                 source=type(lims_model),
                 target=cls.ngi_model_class
             )
 
+    @classmethod
+    def ngi_to_sra_many(
+        cls: Type[T],
+        ngi_models: Iterable[ngi_model_class],
+        processes: Optional[int] = None,
+        chunk_size: int = NGI_TO_SRA_CHUNK_SIZE,
+        min_process_size: int = NGI_TO_SRA_MIN_PROCESS_SIZE,
+        cache: Optional[SRAConversionCache] = None,
+    ) -> List[sra_model_class]:
+        """
+        Convert NGI models to SRA models using this converter, in the order they are supplied.
+        Within the batch, value objects with identical values, e.g. the study references and
+        sequencing platforms shared by many experiments, are converted once and the converted
+        objects are shared by the SRA models. With more than one process and more than
+        min_process_size models, the models are converted in chunks by a pool of worker
+        processes, each chunk being a batch of its own.
+
+        :param ngi_models: an iterable of NGIMetadataModel objects
+        :param processes: the number of worker processes, or None to convert in this process
+        :param chunk_size: the number of models sent to a worker process at a time
+        :param min_process_size: the number of models above which worker processes are used
+        :param cache: a SRAConversionCache to reuse the conversions of unchanged models from,
+        or None to convert all models
+        :return: a list of the converted SRAMetadataModel objects
+        """
+        if cache is not None:
+            return cache.ngi_to_sra_many(
+                cls,
+                ngi_models,
+                processes=processes,
+                chunk_size=chunk_size,
+                min_process_size=min_process_size
+            )
+        if processes and processes > 1:
+            ngi_models = list(ngi_models)
+            if len(ngi_models) > min_process_size:
+                return cls._ngi_to_sra_in_processes(ngi_models, processes, chunk_size)
+        # a batch nested in another batch shares the memoized conversions of the outer batch
+        if getattr(_ngi_to_sra_batch, "memo", None) is not None:
+            return [cls.ngi_to_sra(ngi_model=ngi_model) for ngi_model in ngi_models]
+        _ngi_to_sra_batch.memo = {}
+        try:
+            return [cls.ngi_to_sra(ngi_model=ngi_model) for ngi_model in ngi_models]
+        finally:
+            _ngi_to_sra_batch.memo = None
+
+    @classmethod
+    def _ngi_to_sra_in_processes(
+        cls: Type[T],
+        ngi_models: List[ngi_model_class],
+        processes: int,
+        chunk_size: int
+    ) -> List[sra_model_class]:
+        sra_models = []
+        for sra_model, error in _convert_in_processes(
+                _ngi_to_sra_chunk, cls, ngi_models, processes, chunk_size
+        ):
+            if error is not None:
+                # raise the exception that the conversion raised in the worker process
+                exception_cls, source, target, reason = error
+                raise exception_cls(source=source, target=target, reason=reason)
+            sra_models.append(sra_model)
+        return sra_models
+
+    @classmethod
+    def lims_to_ngi_many(
+        cls: Type[T],
+        lims_models: Iterable[lims_model_class],
+        processes: Optional[int] = None,
+        chunk_size: int = LIMS_TO_NGI_CHUNK_SIZE,
+    ) -> Iterator[ngi_model_class]:
+        """
+        Convert LIMS models to NGI models using this converter, in the order they are supplied.
+        Models that can not be converted are logged and skipped. With more than one process, the
+        models are converted in chunks by a pool of worker processes.
+
+        :param lims_models: an iterable of LIMSMetadataModel objects
+        :param processes: the number of worker processes, or None to convert in this process
+        :param chunk_size: the number of models sent to a worker process at a time
+        :return: an iterator over the converted NGIMetadataModel objects
+        """
+        if not processes or processes < 2:
+            results = map(lambda m: _lims_to_ngi_or_error(cls, m), lims_models)
+        else:
+            results = _convert_in_processes(
+                _lims_to_ngi_chunk, cls, lims_models, processes, chunk_size
+            )
+        for ngi_model, error in results:
+            if error is not None:
+                # log this as an error but continue with the other models
+                LOG.error(error)
+            elif ngi_model is not None:
+                yield ngi_model
+
+
+def _lims_to_ngi_or_error(
+        converter: Type[Converter],
+        lims_model: LIMSMetadataModel
+) -> Tuple[Optional[NGIMetadataModel], Optional[str]]:
+    # conversion errors are passed back as strings since not all of them can be pickled
+    try:
+        with outermost_conversion():
+            return converter.lims_to_ngi(lims_model=lims_model), None
+    except ModelConversionException as ex:
+        return None, f"{lims_model} skipped - {str(ex)}"
+
+
+def _lims_to_ngi_chunk(
+        converter: Type[Converter],
+        lims_models: List[LIMSMetadataModel]
+) -> List[Tuple[Optional[NGIMetadataModel], Optional[str]]]:
+    return [_lims_to_ngi_or_error(converter, lims_model) for lims_model in lims_models]
+
+
+def _ngi_to_sra_chunk(
+        converter: Type[Converter],
+        ngi_models: List[NGIMetadataModel]
+) -> List[Tuple[Optional[SRAMetadataModel], Optional[Tuple]]]:
+    # the chunk is converted as a batch, the first error fails the whole chunk. The error is
+    # passed back as the exception class, source, target and reason, with the reason as a
+    # string since not all exceptions can be pickled
+    try:
+        with outermost_conversion():
+            return [(sra_model, None) for sra_model in converter.ngi_to_sra_many(ngi_models)]
+    except ModelConversionException as ex:
+        reason = str(ex.reason) if ex.reason is not None else None
+        return [(None, (type(ex), ex.source, ex.target, reason))]
+
+
+def _convert_in_processes(
+        convert_chunk: Callable[[Type[Converter], List[MetadataModel]], List[Tuple]],
+        converter: Type[Converter],
+        models: Iterable[MetadataModel],
+        processes: int,
+        chunk_size: int
+) -> Iterator[Tuple]:
+    # the results are yielded in input order. Only a couple of chunks per process are in flight,
+    # so that streamed input is not read much ahead of the results being consumed
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = collections.deque()
+        for chunk in iter_chunks(models, chunk_size):
+            pending.append(executor.submit(convert_chunk, converter, chunk))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
 
 class ConvertSampleDescriptor(Converter):
     """
@@ -255,26 +763,14 @@ class ConvertPool(Converter):
     @classmethod
     @catch_exception
     def lims_to_ngi(
-        cls: Type[T], lims_model: lims_model_class
+        cls: Type[T], lims_model: lims_model_class, processes: Optional[int] = None
     ) -> Optional[ngi_model_class]:
         if lims_model:
-            samples = []
-            for lims_sample in lims_model.samples or []:
-                try:
-                    samples.append(
-                        ConvertPoolMember.lims_to_ngi(
-                            lims_model=lims_sample
-                        )
-                    )
-                except ModelConversionException as ex:
-                    # log this as an error but continue with the other samples
-                    LOG.error(f"{lims_sample} skipped - {str(ex)}")
-
             return cls.ngi_model_class(
                 samples=list(
-                    filter(
-                        lambda s: s is not None,
-                        samples
+                    ConvertPoolMember.lims_to_ngi_many(
+                        lims_model.samples or [],
+                        processes=processes
                     )
                 )
             )
@@ -291,6 +787,7 @@ class ConvertStudyRef(Converter):
 
     @classmethod
     @catch_exception
+    @memoize_in_batch
     def ngi_to_sra(
         cls: Type[T], ngi_model: ngi_model_class
     ) -> Optional[sra_model_class]:
@@ -303,7 +800,7 @@ class ConvertStudyRef(Converter):
         cls: Type[T], lims_model: lims_model_class
     ) -> Optional[ngi_model_class]:
         if lims_model:
-            return cls.ngi_model_class(project_id=lims_model.project_id)
+            return cls.ngi_model_class.shared(lims_model.project_id)
 
 
 class ConvertRun(Converter):
@@ -346,6 +843,7 @@ class ConvertSequencingPlatform(Converter):
 
     @classmethod
     @catch_exception
+    @memoize_in_batch
     def ngi_to_sra(
         cls: Type[T], ngi_model: ngi_model_class
     ) -> Optional[sra_model_class]:
@@ -359,9 +857,7 @@ class ConvertSequencingPlatform(Converter):
     ) -> Optional[ngi_model_class]:
         if lims_model:
             try:
-                return cls.ngi_model_class(
-                    model_name=lims_model.udf_sequencing_instrument
-                )
+                return cls.ngi_model_class.shared(lims_model.udf_sequencing_instrument)
             except AttributeError:
                 raise InstrumentModelNotRecognizedException(needle="None")
 
@@ -377,11 +873,18 @@ class ConvertRunSet(Converter):
     @classmethod
     @catch_exception
     def ngi_to_sra(
-        cls: Type[T], ngi_model: ngi_model_class
+        cls: Type[T],
+        ngi_model: ngi_model_class,
+        processes: Optional[int] = None,
+        cache: Optional[SRAConversionCache] = None,
     ) -> Optional[sra_model_class]:
         if ngi_model:
             return cls.sra_model_class.create_object(
-                runs=[Converter.ngi_to_sra(f) for f in ngi_model.sequencing_runs or []]
+                runs=Converter.ngi_to_sra_many(
+                    ngi_model.sequencing_runs or [],
+                    processes=processes,
+                    cache=cache
+                )
             )
 
 
@@ -460,35 +963,100 @@ class ConvertExperimentSet(Converter):
     @classmethod
     @catch_exception
     def ngi_to_sra(
-        cls: Type[T], ngi_model: ngi_model_class
+        cls: Type[T],
+        ngi_model: ngi_model_class,
+        processes: Optional[int] = None,
+        cache: Optional[SRAConversionCache] = None,
     ) -> Optional[sra_model_class]:
         if ngi_model:
             return cls.sra_model_class.create_object(
-                experiments=[
-                    Converter.ngi_to_sra(ngi_experiment)
-                    for ngi_experiment in ngi_model.experiments or []
-                ]
+                experiments=Converter.ngi_to_sra_many(
+                    ngi_model.experiments or [],
+                    processes=processes,
+                    cache=cache
+                )
             )
 
     @classmethod
     @catch_exception
     def lims_to_ngi(
-        cls: Type[T], lims_model: lims_model_class
+        cls: Type[T],
+        lims_model: lims_model_class,
+        processes: Optional[int] = None,
+        validation_report: Optional[LIMSValidationReport] = None,
     ) -> Optional[ngi_model_class]:
         if lims_model:
-            experiments = []
-            for lims_sample in lims_model.samples or []:
-                try:
-                    experiment = ConvertExperiment.lims_to_ngi(
-                        lims_model=lims_sample
+            return cls.ngi_model_class(
+                experiments=list(
+                    cls.lims_samples_to_ngi(
+                        cls.valid_samples(lims_model, validation_report),
+                        processes=processes
                     )
-                    if experiment is not None:
-                        experiments.append(experiment)
-                except ModelConversionException as ex:
-                    # log this as an error but continue with the other samples
-                    LOG.error(f"{lims_sample} skipped - {str(ex)}")
+                )
+            )
+
+    @classmethod
+    @catch_exception
+    def lims_to_sra(
+        cls: Type[T],
+        lims_model: lims_model_class,
+        processes: Optional[int] = None,
+        validation_report: Optional[LIMSValidationReport] = None,
+        cache: Optional[SRAConversionCache] = None,
+    ) -> Optional[sra_model_class]:
+        """
+        Convert a LIMS container directly to an SRA experiment set, in one pass and without an
+        intermediate NGIExperimentSet. Each sample is converted to an SRA experiment as soon as
+        it has been converted to an NGI experiment, and the result is identical to converting
+        the NGIExperimentSet from lims_to_ngi with ngi_to_sra.
+
+        :param lims_model: a LIMSSequencingContainer object
+        :param processes: the number of worker processes converting the samples to NGI models,
+        or None to convert in this process
+        :param validation_report: a LIMSValidationReport for the samples, or None to validate
+        the samples of the container
+        :param cache: a SRAConversionCache to reuse the conversions of unchanged experiments
+        from, or None to convert all experiments
+        :return: a SRAExperimentSet object
+        """
+        if lims_model:
+            return cls.sra_model_class.create_object(
+                experiments=Converter.ngi_to_sra_many(
+                    cls.lims_samples_to_ngi(
+                        cls.valid_samples(lims_model, validation_report),
+                        processes=processes
+                    ),
+                    cache=cache
+                )
+            )
 
-            return cls.ngi_model_class(experiments=experiments)
+    @classmethod
+    def valid_samples(
+        cls: Type[T],
+        lims_model: lims_model_class,
+        validation_report: Optional[LIMSValidationReport] = None,
+    ) -> Iterator[LIMSSample]:
+        # samples that would fail the conversion are skipped up front and reported once, rather
+        # than raising an exception for each of them
+        samples = lims_model.samples or []
+        if validation_report is None:
+            validation_report = LIMSValidationReport.from_samples(samples)
+            validation_report.log()
+        return validation_report.valid_samples(samples)
+
+    @classmethod
+    def lims_samples_to_ngi(
+        cls: Type[T], lims_samples: Iterable[LIMSSample], processes: Optional[int] = None
+    ) -> Iterator[NGIExperiment]:
+        """
+        Convert LIMS samples to NGI experiments as they are consumed, e.g. as they are parsed
+        from a LIMS export. Samples that can not be converted are logged and skipped.
+
+        :param lims_samples: an iterable of LIMSSample objects
+        :param processes: the number of worker processes, or None to convert in this process
+        :return: an iterator over the converted NGIExperiment objects
+        """
+        return ConvertExperiment.lims_to_ngi_many(lims_samples, processes=processes)
 
 
 class ConvertLibraryLayout(Converter):
@@ -1,7 +1,9 @@
 
-from typing import TypeVar, ClassVar, List, Type, Optional, Dict
+from functools import lru_cache
+from typing import Tuple, TypeVar, ClassVar, List, Type, Optional, Dict
 
 from snpseq_metadata.models.lims_models.metadata_model import LIMSMetadataModel
+from snpseq_metadata.utilities import intern_value
 
 A = TypeVar("A", bound="LIMSLibraryObject")
 
@@ -35,31 +37,52 @@ class LIMSLibraryObject(LIMSMetadataModel):
             cls: Type[A],
             udf: Optional[str],
     ) -> Optional[A]:
-
-        matches = list(
-            filter(
-                lambda m: m is not None,
-                map(
-                    lambda c: c.match(udf),
-                    cls.__subclasses__()
-                )
-            )
-        )
-
         # if the udf string is empty, don't match anything
         if not udf:
             return None
+        match_cls = cls.lookup_class(udf)
+        return match_cls.shared(intern_value(udf)) if match_cls else None
 
-        # return the first match
-        if matches:
-            return matches[0]
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def lookup_class(
+            cls: Type[A],
+            udf: Optional[str],
+    ) -> Optional[Type[A]]:
+        index, catch_all = cls.term_index()
+        return index.get(cls.normalize_udf(udf), catch_all)
 
-        # if no subclass matched, check this class for matches. if "udf_terms" is empty, it is the
-        # "top" class and nothing has matched so return the class representing e.g. "other"
-        if cls.match_terms(udf) or not cls.udf_terms:
-            return cls(udf)
+    @classmethod
+    def match_order(cls: Type[A]) -> List[Type[A]]:
+        # the order in which the classes are tried when matching: the subclasses, depth-first
+        # and in order of definition, before the class itself
+        return [
+            match_cls
+            for subclass in cls.__subclasses__()
+            for match_cls in subclass.match_order()
+        ] + [cls]
 
-        return None
+    @classmethod
+    @lru_cache(maxsize=None)
+    def term_index(cls: Type[A]) -> Tuple[Dict[str, Type[A]], Optional[Type[A]]]:
+        # compile the class hierarchy, once, into a dict from normalized term to the first
+        # class in match order having the term. A class without terms matches anything, so it
+        # is returned as the catch-all and no classes after it can be matched
+        index = {}
+        for match_cls in cls.match_order():
+            if not match_cls.udf_terms:
+                return index, match_cls
+            for term in match_cls.udf_terms:
+                index.setdefault(cls.normalize_term(term), match_cls)
+        return index, None
+
+    @staticmethod
+    def normalize_term(term: str) -> str:
+        return term.lower().replace("-", " ").replace(" ", "")
+
+    @staticmethod
+    def normalize_udf(udf: str) -> str:
+        return udf.lower().replace("rml-", "").replace("-", " ").replace(" ", "")
 
     @classmethod
     def match_terms(
@@ -67,9 +90,9 @@ class LIMSLibraryObject(LIMSMetadataModel):
             udf: Optional[str],
     ) -> bool:
         return udf and (
-                udf.lower().replace("rml-", "").replace("-", " ").replace(" ", "") in
+                cls.normalize_udf(udf) in
                 [
-                    na.lower().replace("-", " ").replace(" ", "")
+                    cls.normalize_term(na)
                     for na in cls.udf_terms
                 ]
         )
@@ -95,11 +118,9 @@ class LIMSLibraryKitRML(LIMSLibraryObject):
     library_object_type = "udf_rml_kitprotocol"
 
     @classmethod
-    def match(
-            cls: Type[A],
-            udf: Optional[str],
-    ) -> Optional[A]:
-        return LIMSLibraryKit.match(udf)
+    def match_order(cls: Type[A]) -> List[Type[A]]:
+        # RML kit protocols are matched against the library kits
+        return LIMSLibraryKit.match_order()
 
 
 # use an outer class, mainly for overview
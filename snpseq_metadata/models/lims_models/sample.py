@@ -1,12 +1,30 @@
-from typing import Dict, Optional, Type, TypeVar
+import sys
+from typing import Callable, ClassVar, Dict, List, Optional, Type, TypeVar
 
 from snpseq_metadata.models.lims_models.metadata_model import LIMSMetadataModel
 from snpseq_metadata.models.lims_models.library_design import LIMSLibraryObject
+from snpseq_metadata.utilities import intern_value
 
 
 L = TypeVar("L", bound="LIMSSample")
 
 
+def _resolve_udf_aliases(aliases: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    # flatten the alias chains into one list of fallbacks per name, in order of precedence. A
+    # name is never visited twice, so aliases referring back to each other are resolved too
+    resolved = {}
+    for name in aliases:
+        chain = []
+        pending = list(aliases[name])
+        while pending:
+            alias = pending.pop(0)
+            if alias != name and alias not in chain:
+                chain.append(alias)
+                pending.extend(aliases.get(alias, []))
+        resolved[name] = chain
+    return resolved
+
+
 class LIMSSample(LIMSMetadataModel):
 
     non_udf_fields: Dict[str, str] = {
@@ -15,6 +33,81 @@ class LIMSSample(LIMSMetadataModel):
         "project_id": "project"
     }
 
+    # UDFs that can be used in place of a missing UDF, e.g. udf_rml_kitprotocol is used if
+    # udf_library_preparation_kit is missing
+    udf_aliases: ClassVar[Dict[str, List[str]]] = _resolve_udf_aliases({
+        "udf_library_preparation_kit": ["udf_rml_kitprotocol"],
+        "udf_insert_size_bp": ["udf_length_current_bp"],
+        "udf_length_current_bp": ["udf_insert_size_bp"],
+        "udf_sample_library_id": ["udf_sample_library_name"],
+    })
+
+    # UDFs that are derived from other values if they are missing
+    udf_derived: ClassVar[Dict[str, Callable[["LIMSSample"], object]]] = {
+        "udf_sample_library_name": lambda sample: f"{sample.sample_id}_{sample.udf_id}",
+    }
+
+    # the UDFs that a derived UDF is derived from
+    udf_derived_requires: ClassVar[Dict[str, List[str]]] = {
+        "udf_sample_library_name": ["udf_id"],
+    }
+
+    # UDFs that are None if they, and their aliases, are missing
+    udf_optional: ClassVar[List[str]] = [
+        "udf_insert_size_bp",
+        "udf_length_current_bp",
+        "udf_fragment_size",
+        "udf_fragment_lower",
+        "udf_fragment_upper"
+    ]
+
+    # the columns that the fields of a LIMS export are read from when parsing a csv export, in
+    # the order of the fields in a json export. Fields whose column is missing are read from
+    # the column having the same name as the field, if any
+    csv_column_mapping: ClassVar[Dict[str, str]] = {
+        "name": "sample_name",
+        "project": "project_id",
+        "sample_id": "sample_id",
+        "udf_application": "experiment_application",
+        "udf_conc_fc": "udf_conc_fc",
+        "udf_current_sample_volume_ul": "udf_current_sample_volume_ul",
+        "udf_custom_sequencing_primer": "udf_custom_sequencing_primer",
+        "udf_data_analysis": "udf_data_analysis",
+        "udf_genotyping_idpanel": "udf_genotyping_idpanel",
+        "udf_id": "udf_id",
+        "udf_index": "index_i7",
+        "udf_index2": "index_i5",
+        "udf_insert_size_bp": "insert_size",
+        "udf_library_preparation_kit": "experiment_library_kit",
+        "udf_number_of_lanes": "udf_number_of_lanes",
+        "udf_of_libraries_per_sample": "udf_of_libraries_per_sample",
+        "udf_phix_": "udf_phix_",
+        "udf_plate_": "udf_plate_",
+        "udf_pooling": "udf_pooling",
+        "udf_progress": "udf_progress",
+        "udf_read_length": "read_configuration",
+        "udf_rml_kitprotocol": "udf_rml_kitprotocol",
+        "udf_sample_conc": "udf_sample_conc",
+        "udf_sample_library_name": "sample_library_name",
+        "udf_sample_library_id": "sample_library_id",
+        "udf_sample_type": "experiment_sample_type",
+        "udf_seq_data_coverage_x": "udf_seq_data_coverage_x",
+        "udf_sequencing_instrument": "experiment_instrument_model_name",
+        "udf_special_info_prep": "udf_special_info_prep",
+        "udf_special_info_seq": "udf_special_info_seq",
+        "udf_species": "udf_species",
+        "udf_fragment_size": "udf_fragment_size",
+        "udf_fragment_lower": "udf_fragment_lower",
+        "udf_fragment_upper": "udf_fragment_upper",
+        "udf_volume_ul": "udf_volume_ul",
+    }
+
+    # the library design classes, indexed by the UDF they are parsed from
+    library_object_classes: ClassVar[Dict[str, Type[LIMSLibraryObject]]] = {
+        lib_class.library_object_type: lib_class
+        for lib_class in LIMSLibraryObject.__subclasses__()
+    }
+
     def __init__(
             self,
             sample_name: str,
@@ -25,45 +118,47 @@ class LIMSSample(LIMSMetadataModel):
         self.sample_name = sample_name
         self.sample_id = sample_id
         self.project_id = project_id
-        for udf_name, udf_value in udf.items():
-            setattr(self, udf_name, udf_value)
+        # the UDFs are stored in the instance dict in one update, so that UDFs present are
+        # plain attribute lookups and only missing UDFs are resolved by __getattr__
+        attributes = vars(self)
+        attributes.update(udf)
 
         # create library design objects
-        for lib_class in LIMSLibraryObject.__subclasses__():
-            udf_name = lib_class.library_object_type
-            if udf_name in udf:
-                setattr(
-                    self,
-                    udf_name,
-                    lib_class.match(udf[udf_name]) or ""
-                )
+        for udf_name in self.library_object_classes.keys() & udf.keys():
+            attributes[udf_name] = \
+                self.library_object_classes[udf_name].match(udf[udf_name]) or ""
 
     def __str__(self) -> str:
         return f"LIMSSample: '{self.sample_name}'"
 
     def __getattr__(self, name: str) -> object:
-        # override the __getattr__ in order to return udf_rml_kitprotocol if
-        # udf_library_preparation_kit is missing
-        if name == "udf_library_preparation_kit":
-            return self.udf_rml_kitprotocol
-        if name == "udf_insert_size_bp":
-            return self.udf_length_current_bp
-        if name == "udf_length_current_bp":
-            return self.udf_insert_size_bp
-        if name == "udf_sample_library_id":
-            return self.udf_sample_library_name
-        if name == "udf_sample_library_name":
-            return f"{self.sample_id}_{self.udf_id}"
-        if name in [
-            "udf_insert_size_bp",
-            "udf_length_current_bp",
-            "udf_fragment_size",
-            "udf_fragment_lower",
-            "udf_fragment_upper"
-        ]:
+        # only called for attributes not found on the instance. Special attributes, e.g. looked
+        # up before __init__ when unpickling, are not resolved
+        if name.startswith("__"):
+            raise AttributeError(name)
+        attributes = vars(self)
+        aliases = self.udf_aliases.get(name, [])
+        for alias in aliases:
+            if alias in attributes:
+                return attributes[alias]
+        for alias in [name] + aliases:
+            if alias in self.udf_derived:
+                return self.udf_derived[alias](self)
+        if name in self.udf_optional:
             return None
         raise AttributeError(f"{str(self)} is missing attribute '{name}'")
 
+    def has_udf(self, name: str) -> bool:
+        # whether the attribute would be resolved by __getattr__, without raising AttributeError
+        attributes = vars(self)
+        aliases = self.udf_aliases.get(name, [])
+        if name in attributes or any(alias in attributes for alias in aliases):
+            return True
+        for alias in [name] + aliases:
+            if alias in self.udf_derived:
+                return all(map(self.has_udf, self.udf_derived_requires.get(alias, [])))
+        return name in self.udf_optional
+
     def is_paired(self) -> Optional[bool]:
         read_length = getattr(self, "udf_read_length", None)
         if read_length is not None:
@@ -80,12 +175,14 @@ class LIMSSample(LIMSMetadataModel):
 
     @classmethod
     def from_json(cls: Type[L], json_obj: Dict[str, str]) -> L:
+        # the names and values are interned, since many of them repeat across the samples of
+        # a container, e.g. project ids, applications and library kits
         non_udf = {
-            k: json_obj.get(v)
+            k: intern_value(json_obj.get(v))
             for k, v in cls.non_udf_fields.items()
         }
         udf = {
-            k: v
+            sys.intern(k): intern_value(v)
             for k, v in json_obj.items()
             if k not in cls.non_udf_fields.values()
         }
@@ -94,6 +191,41 @@ class LIMSSample(LIMSMetadataModel):
             **udf
         )
 
+    @classmethod
+    def from_csv_record(
+            cls: Type[L],
+            record: Dict[str, object],
+            column_mapping: Optional[Dict[str, str]] = None
+    ) -> L:
+        """
+        Create a LIMSSample from a record of a csv export, without going through the json
+        format of a LIMS export. Fields missing from the record are left out, so that they are
+        resolved through their aliases or derived, as for a json export. Columns that are not
+        read into a field are kept under their own name.
+
+        :param record: a dict with the values of a csv record, indexed by column
+        :param column_mapping: a dict with the column to read a field from, indexed by field,
+        overriding the columns in csv_column_mapping
+        :return: a LIMSSample object
+        """
+        column_mapping = {**cls.csv_column_mapping, **(column_mapping or {})}
+        json_obj = {}
+        read_columns = set()
+        for field, column in column_mapping.items():
+            column = column if column in record else field
+            if column in record:
+                json_obj[field] = record[column]
+                read_columns.add(column)
+        # the columns holding the non-UDF fields are not kept, since they would be passed to
+        # the constructor twice
+        json_obj.update({
+            column: value
+            for column, value in record.items()
+            if column not in read_columns and column not in json_obj
+            and column not in cls.non_udf_fields
+        })
+        return cls.from_json(json_obj=json_obj)
+
     def to_json(self) -> Dict:
         json_obj = {}
         for k, v in vars(self).items():
@@ -1,5 +1,6 @@
-from typing import Dict, List, Type, TypeVar
+from typing import ClassVar, Dict, Iterable, Iterator, List, Optional, TextIO, Type, TypeVar
 
+import snpseq_metadata.utilities
 from snpseq_metadata.models.lims_models.metadata_model import LIMSMetadataModel
 from snpseq_metadata.models.lims_models.sample import LIMSSample
 
@@ -7,6 +8,10 @@ L = TypeVar("L", bound="LIMSSequencingContainer")
 
 
 class LIMSSequencingContainer(LIMSMetadataModel):
+
+    # the column of a csv export holding the name of the container
+    csv_name_column: ClassVar[str] = "flowcell_id"
+
     def __init__(self, name: str, samples: List[LIMSSample]):
         self.name = name
         self.samples = samples
@@ -21,5 +26,48 @@ class LIMSSequencingContainer(LIMSMetadataModel):
         ]
         return cls(name=name, samples=samples)
 
+    @staticmethod
+    def iter_samples(fh: TextIO) -> Iterator[LIMSSample]:
+        """
+        Incrementally parse the samples from a LIMS export, one at a time, without loading
+        the whole export into memory.
+
+        :param fh: a text file handle to the LIMS export json
+        :return: an iterator over the LIMSSample objects in the export
+        """
+        for sample_json in snpseq_metadata.utilities.iter_json_array(
+            fh, keys=["result", "samples"]
+        ):
+            yield LIMSSample.from_json(json_obj=sample_json)
+
+    @classmethod
+    def from_csv(
+            cls: Type[L],
+            fhs: Iterable[TextIO],
+            name: Optional[str] = None,
+            column_mapping: Optional[Dict[str, str]] = None
+    ) -> L:
+        """
+        Create a LIMSSequencingContainer straight from csv exports of LIMS samples, with one
+        "key,value" row per field. A file may hold several samples, each sample starts where a
+        key is repeated.
+
+        :param fhs: an iterable of text file handles to the csv exports
+        :param name: the name of the container, if None it is read from the csv_name_column of
+        the first sample having it
+        :param column_mapping: a dict with the column to read a field from, indexed by field,
+        see LIMSSample.csv_column_mapping
+        :return: a LIMSSequencingContainer object
+        """
+        samples = []
+        for fh in fhs:
+            for record in snpseq_metadata.utilities.iter_csv_records(fh):
+                if name is None and record.get(cls.csv_name_column):
+                    name = str(record[cls.csv_name_column])
+                samples.append(
+                    LIMSSample.from_csv_record(record=record, column_mapping=column_mapping)
+                )
+        return cls(name=name, samples=samples)
+
     def to_json(self) -> Dict:
         return {"result": super().to_json()}
@@ -1,5 +1,6 @@
-from typing import Dict, TypeVar, Type, Union, Iterable, List
+from typing import ClassVar, Dict, Hashable, TypeVar, Type, Union, Iterable, List
 import datetime
+import weakref
 
 from snpseq_metadata.exceptions import SomethingNotRecognizedException
 
@@ -8,12 +9,20 @@ T = TypeVar("T")
 
 
 class MetadataModel:
+
+    # instances shared by the models referring to identical values, see shared(). The instances
+    # are only kept for as long as they are referenced
+    _shared_instances: ClassVar[weakref.WeakValueDictionary] = weakref.WeakValueDictionary()
+
+    # attributes with names starting with an underscore are internal and are neither compared
+    # nor serialized
     def __eq__(self, other: object) -> bool:
         return type(other) is type(self) and all(
             map(
                 lambda k: getattr(other, k, None) == getattr(self, k, None),
                 filter(
-                    lambda k: k not in ["model_object", "exporter"], vars(self).keys()
+                    lambda k: k not in ["model_object", "exporter"] and not k.startswith("_"),
+                    vars(self).keys()
                 ),
             )
         )
@@ -22,10 +31,28 @@ class MetadataModel:
     def from_json(cls: Type[M], json_obj: Dict) -> M:
         raise NotImplementedError
 
+    @classmethod
+    def shared(cls: Type[M], *args: Hashable) -> M:
+        """
+        Get an instance of the class created from the arguments, shared with any other caller
+        using identical arguments. Only use this for models that are not modified after they
+        are created, e.g. references to a study or an instrument model.
+
+        :param args: the positional arguments to create the instance from
+        :return: an instance of the class, possibly shared with other models
+        """
+        # the types are part of the key, since e.g. 1 and True are equal
+        key = (cls,) + tuple((type(arg), arg) for arg in args)
+        instance = MetadataModel._shared_instances.get(key)
+        if instance is None:
+            instance = cls(*args)
+            MetadataModel._shared_instances[key] = instance
+        return instance
+
     def to_json(self) -> Dict:
         json_obj = {}
         for name, value in vars(self).items():
-            if value is not None:
+            if value is not None and not name.startswith("_"):
                 json_obj[name] = self._item_to_json(value)
         return json_obj
 
@@ -7,6 +7,8 @@ from snpseq_metadata.models.ngi_models.experiment import (
 )
 from snpseq_metadata.models.ngi_models.file_models import (
     NGIFastqFile,
+    NGIFastqFileTable,
+    NGIFastqFileView,
     NGIResultFile,
 )
 from snpseq_metadata.models.ngi_models.flowcell import NGIFlowcell
@@ -1,4 +1,8 @@
-from typing import Dict, List, Type, TypeVar, Optional
+import hashlib
+import json
+import logging
+import textwrap
+from typing import Dict, Iterable, Iterator, List, TextIO, Type, TypeVar, Optional
 
 from snpseq_metadata.models.ngi_models.sequencing_platform import (
     NGIIlluminaSequencingPlatform,
@@ -13,6 +17,8 @@ TB = TypeVar("TB", bound="NGIExperimentBase")
 TR = TypeVar("TR", bound="NGIExperimentRef")
 TS = TypeVar("TS", bound="NGIExperimentSet")
 
+log = logging.getLogger(__name__)
+
 
 class NGIExperimentBase(NGIMetadataModel):
     def __init__(self, alias: str, project: NGIStudyRef) -> None:
@@ -41,10 +47,16 @@ class NGIExperimentBase(NGIMetadataModel):
 
 class NGIExperimentRef(NGIExperimentBase):
     def __init__(
-        self, alias: str, project: NGIStudyRef, sample: NGISampleDescriptor
+        self,
+        alias: str,
+        project: NGIStudyRef,
+        sample: NGISampleDescriptor,
+        samplesheet: Optional[str] = None,
     ) -> None:
         super().__init__(alias, project)
         self.sample = sample
+        # the samplesheet the experiment was parsed from, only recorded if there are several
+        self.samplesheet = samplesheet
 
     @classmethod
     def from_samplesheet_row(
@@ -88,6 +100,7 @@ class NGIExperimentRef(NGIExperimentBase):
             alias=json_obj.get("alias"),
             project=NGIStudyRef.from_json(json_obj.get("project")),
             sample=NGISampleDescriptor.from_json(json_obj.get("sample")),
+            samplesheet=json_obj.get("samplesheet"),
         )
 
     def get_reference(self) -> TR:
@@ -140,6 +153,76 @@ class NGIExperimentSet(NGIMetadataModel):
         ]
         return cls(experiments=experiments)
 
+    @classmethod
+    def merge(cls: Type[TS], experiment_sets: Iterable[TS]) -> TS:
+        """
+        Merge experiment sets, e.g. converted from several LIMS containers for the same
+        flowcell, into one experiment set. Experiments are de-duplicated on their alias, see
+        unique_experiments.
+
+        :param experiment_sets: an iterable of NGIExperimentSet objects
+        :return: a NGIExperimentSet object containing the unique experiments from all sets
+        """
+        return cls(
+            experiments=list(
+                cls.unique_experiments(
+                    experiment
+                    for experiment_set in experiment_sets
+                    for experiment in experiment_set.experiments or []
+                )
+            )
+        )
+
+    @staticmethod
+    def unique_experiments(experiments: Iterable[T]) -> Iterator[T]:
+        """
+        Iterate over the experiments, skipping experiments whose alias has already been seen.
+        The first experiment with an alias is kept, and a warning is logged if a later
+        experiment with the same alias differs from it.
+
+        :param experiments: an iterable of NGIExperiment objects
+        :return: an iterator over the experiments with unique aliases, in their original order
+        """
+        # only a digest of each experiment seen is kept, so that the experiments need not be
+        # kept in memory when streamed
+        alias_index = {}
+        for experiment in experiments:
+            digest = hashlib.sha256(
+                json.dumps(experiment.to_json(), sort_keys=True).encode("utf-8")
+            ).digest()
+            seen = alias_index.setdefault(experiment.alias, digest)
+            if seen is digest:
+                yield experiment
+            elif seen != digest:
+                log.warning(
+                    f"experiment {experiment.alias} occurs more than once with different "
+                    f"metadata, only the first occurrence is kept")
+
+    def dump_json(self, fh: TextIO, indent: int = 2) -> None:
+        """
+        Write the experiment set as json, serializing one experiment at a time. The output is
+        identical to json.dump(self.to_json(), fh, indent=indent), but the experiments may be
+        any iterable, e.g. a generator, and are never all kept in memory.
+
+        :param fh: a text file handle to write to
+        :param indent: the indentation level, as for json.dump
+        """
+        if self.experiments is None:
+            # to_json leaves out the experiments altogether
+            fh.write("{}")
+            return
+        pad = " " * indent
+        fh.write(f"{{\n{pad}\"experiments\": [")
+        separator = "\n"
+        for experiment in self.experiments:
+            experiment_json = json.dumps(experiment.to_json(), indent=indent)
+            fh.write(separator)
+            fh.write(textwrap.indent(experiment_json, pad * 2))
+            separator = ",\n"
+        if separator != "\n":
+            fh.write(f"\n{pad}")
+        fh.write("]\n}")
+
     def get_experiment_for_reference(
         self, experiment_ref: NGIExperimentRef
     ) -> Optional[NGIExperiment]:
@@ -1,6 +1,10 @@
+import array
+import collections.abc
+import hashlib
 import os
+import re
 
-from typing import Dict, TypeVar, Type
+from typing import ClassVar, Dict, Iterable, List, Optional, TypeVar, Type
 
 from snpseq_metadata.models.ngi_models.metadata_model import NGIMetadataModel
 
@@ -57,3 +61,147 @@ class NGIFastqFile(NGIResultFile):
             checksum_method=checksum_method,
             relative_path=relative_path
         )
+
+
+class NGIFastqFileTable:
+    """
+    A columnar table of the fastq files of a flowcell. The directories are stored once and the
+    lane, read, size and checksum digest of the files are stored in parallel arrays, which
+    keeps the memory footprint small for flowcells with hundreds of thousands of files.
+    NGIFastqFile objects are created on demand, by indexing the table or through a
+    NGIFastqFileView.
+
+    The paths added to the table are expected to be relative already, so no relative paths
+    need to be computed per file.
+    """
+
+    filename_pattern: ClassVar[str] = r"_L(\d{3})_([RI]\d)_\d{3}\."
+    read_labels: ClassVar[List[str]] = ["R1", "R2", "R3", "I1", "I2"]
+
+    def __init__(self, filetype: str = "fastq", checksum_method: str = "MD5") -> None:
+        self.filetype = filetype
+        self.checksum_method = checksum_method
+        try:
+            self._digest_size = hashlib.new(checksum_method).digest_size
+        except ValueError:
+            self._digest_size = 0
+        self._dirs: List[str] = []
+        self._dir_index: Dict[str, int] = {}
+        self._dir = array.array("I")
+        self._names: List[str] = []
+        self._lane = array.array("h")
+        self._read = array.array("b")
+        self._size = array.array("q")
+        self._digests = bytearray()
+        # checksums that can not be stored as a digest, e.g. if missing or not hexadecimal
+        self._checksums: Dict[int, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, index: int) -> NGIFastqFile:
+        return NGIFastqFile(
+            filepath=self.filepath(index),
+            filetype=self.filetype,
+            checksum=self.checksum(index),
+            checksum_method=self.checksum_method,
+        )
+
+    def append(
+        self,
+        dirpath: str,
+        filename: str,
+        checksum: Optional[str],
+        size: Optional[int] = None,
+    ) -> int:
+        """
+        Add a file to the table
+
+        :param dirpath: the (relative) path to the directory containing the file
+        :param filename: the name of the file
+        :param checksum: the checksum of the file
+        :param size: the size of the file in bytes, if known
+        :return: the index of the file in the table
+        """
+        index = len(self._names)
+        if dirpath not in self._dir_index:
+            self._dir_index[dirpath] = len(self._dirs)
+            self._dirs.append(dirpath)
+        self._dir.append(self._dir_index[dirpath])
+        self._names.append(filename)
+
+        m = re.search(self.filename_pattern, filename)
+        self._lane.append(int(m.group(1)) if m else -1)
+        self._read.append(
+            self.read_labels.index(m.group(2))
+            if m and m.group(2) in self.read_labels
+            else -1
+        )
+        self._size.append(size if size is not None else -1)
+
+        digest = None
+        if checksum and len(checksum) == 2 * self._digest_size and checksum == checksum.lower():
+            try:
+                digest = bytes.fromhex(checksum)
+            except ValueError:
+                pass
+        if digest is None:
+            digest = bytes(self._digest_size)
+            self._checksums[index] = checksum
+        self._digests.extend(digest)
+        return index
+
+    def filename(self, index: int) -> str:
+        return self._names[index]
+
+    def filepath(self, index: int) -> str:
+        return os.path.join(self._dirs[self._dir[index]], self._names[index])
+
+    def checksum(self, index: int) -> Optional[str]:
+        if index in self._checksums:
+            return self._checksums[index]
+        start = index * self._digest_size
+        return self._digests[start:start + self._digest_size].hex()
+
+    def lane(self, index: int) -> Optional[int]:
+        lane = self._lane[index]
+        return lane if lane >= 0 else None
+
+    def read(self, index: int) -> Optional[str]:
+        read = self._read[index]
+        return self.read_labels[read] if read >= 0 else None
+
+    def size(self, index: int) -> Optional[int]:
+        size = self._size[index]
+        return size if size >= 0 else None
+
+    def view(self, indexes: Iterable[int]) -> "NGIFastqFileView":
+        return NGIFastqFileView(table=self, indexes=indexes)
+
+
+class NGIFastqFileView(collections.abc.Sequence):
+    """
+    A read-only sequence of NGIFastqFile objects, created on demand from rows in a
+    NGIFastqFileTable. The view compares equal to any sequence of equal NGIFastqFile objects,
+    e.g. a list.
+    """
+
+    def __init__(self, table: NGIFastqFileTable, indexes: Iterable[int]) -> None:
+        self._table = table
+        self._indexes = array.array("I", indexes)
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return NGIFastqFileView(table=self._table, indexes=self._indexes[index])
+        return self._table[self._indexes[index]]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, collections.abc.Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)})"
@@ -2,63 +2,124 @@ import os
 import datetime
 import logging
 import re
-from typing import Dict, List, Optional, Type, TypeVar
+from typing import ClassVar, Dict, List, Optional, Sequence, Type, TypeVar
+from xml.etree import ElementTree
 
 import snpseq_metadata.utilities
-from snpseq_metadata.exceptions import FastqFileLocationNotFoundException
+from snpseq_metadata.exceptions import (
+    FastqFileLocationNotFoundException,
+    InstrumentModelNotRecognizedException,
+    ShardMergeException,
+)
 from snpseq_metadata.models.ngi_models.attribute import NGIAttribute
 from snpseq_metadata.models.ngi_models.metadata_model import NGIMetadataModel
 from snpseq_metadata.models.ngi_models.experiment import NGIExperimentRef, NGIExperiment
-from snpseq_metadata.models.ngi_models.file_models import NGIFastqFile
+from snpseq_metadata.models.ngi_models.file_models import NGIFastqFile, NGIFastqFileTable
 from snpseq_metadata.models.ngi_models.sequencing_run import NGIRun
 from snpseq_metadata.models.ngi_models.sequencing_platform import (
     NGIIlluminaSequencingPlatform,
 )
+from snpseq_metadata.runfolder_source import ListingRunfolderSource, RunfolderSource
 
 log = logging.getLogger(__name__)
 T = TypeVar("T", bound="NGIFlowcell")
 
 
 class NGIFlowcell(NGIMetadataModel):
+
+    runfolder_name_pattern: ClassVar[str] = \
+        r"^((?:20)?\d{2}[01]\d[0123]\d)_([A-Z]+\d+)_(\d+)_([A-Z]?)([A-Z0-9-]+)$"
+    fastq_root_dirs: ClassVar[List[str]] = ["Unaligned", "Demultiplexing"]
+
     def __init__(
         self,
         runfolder_path: str,
         samplesheet: Optional[str] = None,
+        samplesheets: Optional[List[str]] = None,
         run_parameters: Optional[str] = None,
         project_id: Optional[str] = None,
         sample_id: Optional[str] = None,
-        sequencing_runs: List[NGIRun] = None,
+        sequencing_runs: Optional[List[NGIRun]] = None,
+        platform: Optional[NGIIlluminaSequencingPlatform] = None,
+        run_date: Optional[datetime.datetime] = None,
+        flowcell_mode: Optional[str] = None,
+        read_structure: Optional[str] = None,
+        shard: Optional[str] = None,
+        experiment_aliases: Optional[List[str]] = None,
+        source: Optional[RunfolderSource] = None,
     ) -> None:
+        # the source is used for all access to the runfolder contents
+        self._source = source or RunfolderSource(runfolder_path=runfolder_path)
         self.runfolder_path = runfolder_path
         self.runfolder_name = os.path.basename(self.runfolder_path)
         self.flowcell_id = self.get_flowcell_id_from_runfolder_name(self.runfolder_name)
-        self.samplesheet = (
-            os.path.basename(samplesheet)
-            if samplesheet
-            else snpseq_metadata.utilities.find_samplesheet(self.runfolder_path)[0]
-        )
+        if not samplesheets:
+            samplesheets = (
+                [samplesheet]
+                if samplesheet
+                else sorted(
+                    snpseq_metadata.utilities.find_samplesheet(
+                        self.runfolder_path, listdir=self._source.listdir
+                    )
+                )
+            )
+        samplesheets = list(map(os.path.basename, samplesheets))
+        self.samplesheet = samplesheets[0]
+        # all samplesheets are only listed if there are more than one
+        self.samplesheets = samplesheets if len(samplesheets) > 1 else None
         self.run_parameters = (
             os.path.basename(run_parameters)
             if run_parameters
-            else snpseq_metadata.utilities.find_run_parameters(self.runfolder_path)[0]
+            else snpseq_metadata.utilities.find_run_parameters(
+                self.runfolder_path, listdir=self._source.listdir
+            )[0]
         )
         self.project_id = project_id
         self.sample_id = sample_id
         self.checksum_method = "MD5"
-        self.platform = self.get_sequencing_platform()
-        self.run_date = self.get_run_date()
+        # the run parameters are only parsed if the platform or run date are not known already
+        self._run_parameters_data = (
+            self.get_run_parameters_data() if platform is None or run_date is None else {}
+        )
+        self.platform = platform or self.get_sequencing_platform()
+        self.run_date = run_date or self.get_run_date()
+        self.flowcell_mode = flowcell_mode or self._run_parameters_data.get("flowcell_mode")
+        self.read_structure = \
+            read_structure or self._run_parameters_data.get("read_structure")
+        self.shard = shard
+        self.experiment_aliases = experiment_aliases
+        self._fastq_table = NGIFastqFileTable(checksum_method=self.checksum_method)
+        # an empty list of sequencing runs, e.g. from a shard without any runs, is kept as is
         self.sequencing_runs = (
-            sequencing_runs if sequencing_runs else self.get_sequencing_runs()
+            sequencing_runs if sequencing_runs is not None else self.get_sequencing_runs()
         )
 
-    @staticmethod
-    def get_flowcell_id_from_runfolder_name(runfolder_name: str) -> str:
-        pattern = r"^((?:20)?\d{2}[01]\d[0123]\d)_([A-Z]+\d+)_(\d+)_([A-Z]?)([A-Z0-9-]+)$"
-        m = re.match(pattern, runfolder_name)
+    @property
+    def filesystem_statistics(self) -> snpseq_metadata.utilities.FilesystemStatistics:
+        # the file system operations performed while extracting the flowcell
+        return self._source.statistics
+
+    @classmethod
+    def get_flowcell_id_from_runfolder_name(cls: Type[T], runfolder_name: str) -> str:
+        m = re.match(cls.runfolder_name_pattern, runfolder_name)
         if m.groups():
             return m.group(5)
 
+    def get_run_parameters_data(self) -> Dict[str, str]:
+        run_parameters = os.path.join(self.runfolder_path, self.run_parameters)
+        try:
+            with self._source.open(run_parameters, mode="rb") as fh:
+                return snpseq_metadata.utilities.parse_run_parameters(fh)
+        except (OSError, ElementTree.ParseError) as ex:
+            log.debug(f"could not parse {run_parameters}: {ex}")
+            return {}
+
     def get_run_date(self) -> Optional[datetime.datetime]:
+        # prefer the run start date from the run parameters, if available
+        datestr = self._run_parameters_data.get("run_start_date")
+        run_date = snpseq_metadata.utilities.parse_run_date(datestr) if datestr else None
+        if run_date:
+            return run_date
         datestr = self.runfolder_name.split("_")[0]
         try:
             return datetime.datetime.strptime(datestr[-6:], "%y%m%d")
@@ -66,6 +127,17 @@ class NGIFlowcell(NGIMetadataModel):
             pass
 
     def get_sequencing_platform(self) -> NGIIlluminaSequencingPlatform:
+        # prefer the instrument type from the run parameters, if available
+        instrument_type = self._run_parameters_data.get("instrument_type")
+        if instrument_type:
+            try:
+                return NGIIlluminaSequencingPlatform(
+                    model_name=NGIIlluminaSequencingPlatform.model_name_from_instrument_type(
+                        instrument_type=instrument_type
+                    )
+                )
+            except InstrumentModelNotRecognizedException as ex:
+                log.warning(ex)
         model_name = NGIIlluminaSequencingPlatform.model_name_from_id(
             model_id=self.runfolder_name.split("_")[1]
         )
@@ -73,26 +145,109 @@ class NGIFlowcell(NGIMetadataModel):
 
     @classmethod
     def from_json(cls: Type[T], json_obj: Dict) -> T:
-        sequencing_runs = [
-            NGIRun.from_json(r) for r in json_obj.get("sequencing_runs", [])
-        ]
+        sequencing_runs = (
+            [NGIRun.from_json(r) for r in json_obj["sequencing_runs"]]
+            if "sequencing_runs" in json_obj
+            else None
+        )
+        platform_json = json_obj.get("platform")
+        run_date_str = json_obj.get("run_date")
         return cls(
             runfolder_path=json_obj.get("runfolder_path"),
             samplesheet=json_obj.get("samplesheet"),
+            samplesheets=json_obj.get("samplesheets"),
             run_parameters=json_obj.get("run_parameters"),
             sequencing_runs=sequencing_runs,
+            platform=NGIIlluminaSequencingPlatform.from_json(platform_json)
+            if platform_json
+            else None,
+            run_date=datetime.datetime.fromisoformat(run_date_str)
+            if run_date_str
+            else None,
+            flowcell_mode=json_obj.get("flowcell_mode"),
+            read_structure=json_obj.get("read_structure"),
+            shard=json_obj.get("shard"),
+            experiment_aliases=json_obj.get("experiment_aliases"),
+        )
+
+    @classmethod
+    def from_listing(cls: Type[T], runfolder_path: str, listing_file: str, **kwargs) -> T:
+        """
+        Create a NGIFlowcell using a precomputed listing of the files in the runfolder instead
+        of listing the directories on disk. See ListingRunfolderSource for the listing format.
+
+        :param runfolder_path: the path to the runfolder
+        :param listing_file: the path to the listing of the files in the runfolder
+        :param kwargs: additional arguments passed to the NGIFlowcell constructor
+        :return: a NGIFlowcell object
+        """
+        return cls(
+            runfolder_path=runfolder_path,
+            source=ListingRunfolderSource(
+                runfolder_path=runfolder_path,
+                listing_file=listing_file
+            ),
+            **kwargs
+        )
+
+    @classmethod
+    def merge(cls: Type[T], shards: List[T]) -> T:
+        """
+        Merge flowcells extracted with the shard option into one flowcell, identical to the
+        flowcell that would have been extracted without sharding.
+
+        :param shards: a list of NGIFlowcell objects, one for each shard of the runfolder
+        :return: a NGIFlowcell object containing the sequencing runs from all shards
+        """
+        if not shards:
+            raise ShardMergeException("No shards to merge")
+        for shard in shards:
+            if shard.shard is None:
+                raise ShardMergeException(f"{shard.runfolder_name} is not a shard")
+        first = shards[0]
+        shard_count = snpseq_metadata.utilities.parse_shard(first.shard)[1]
+        shard_indexes = []
+        for shard in shards:
+            if (shard.runfolder_name, shard.experiment_aliases) != \
+                    (first.runfolder_name, first.experiment_aliases):
+                raise ShardMergeException(
+                    f"Shard {shard.shard} of {shard.runfolder_name} does not belong to the "
+                    f"same extraction as shard {first.shard} of {first.runfolder_name}")
+            shard_indexes.append(snpseq_metadata.utilities.parse_shard(shard.shard))
+        if sorted(shard_indexes) != [(i, shard_count) for i in range(1, shard_count + 1)]:
+            raise ShardMergeException(
+                f"Expected each of the shards 1/{shard_count} to {shard_count}/{shard_count} "
+                f"exactly once for {first.runfolder_name}, got "
+                f"{', '.join(shard.shard for shard in shards)}")
+
+        # restore the order the sequencing runs would have had in an unsharded extraction
+        order = {alias: i for i, alias in reversed(list(enumerate(first.experiment_aliases)))}
+        sequencing_runs = sorted(
+            [run for shard in shards for run in shard.sequencing_runs or []],
+            key=lambda run: order[run.experiment.alias]
+        )
+        return cls(
+            runfolder_path=first.runfolder_path,
+            samplesheet=first.samplesheet,
+            samplesheets=first.samplesheets,
+            run_parameters=first.run_parameters,
+            sequencing_runs=sequencing_runs,
+            platform=first.platform,
+            run_date=first.run_date,
+            flowcell_mode=first.flowcell_mode,
+            read_structure=first.read_structure,
         )
 
     def get_checksumfile(self) -> Optional[str]:
         checksumfile = os.path.join(
             self.runfolder_path, self.checksum_method, "checksums.md5"
         )
-        return checksumfile if os.path.exists(checksumfile) else None
+        return checksumfile if self._source.exists(checksumfile) else None
 
     def get_fastqdir_for_experiment_ref(self, experiment_ref: NGIExperimentRef) -> str:
         fastqdir = self.runfolder_path
         patterns = [
-            ["Unaligned", "Demultiplexing"],
+            self.fastq_root_dirs,
             [
                 experiment_ref.project.project_id,
                 f"Project_{experiment_ref.project.project_id}",
@@ -108,9 +263,9 @@ class NGIFlowcell(NGIMetadataModel):
                     fastqdir,
                     next(
                         filter(
-                            lambda d: os.path.isdir(os.path.join(fastqdir, d))
-                            and d in pattern,
-                            os.listdir(fastqdir),
+                            lambda d: d in pattern
+                            and self._source.isdir(os.path.join(fastqdir, d)),
+                            self._source.listdir(fastqdir),
                         )
                     ),
                 )
@@ -124,65 +279,91 @@ class NGIFlowcell(NGIMetadataModel):
         return fastqdir
 
     def get_experiments(self) -> List[NGIExperimentRef]:
-        samplesheet_data = snpseq_metadata.utilities.parse_samplesheet_data(
-            os.path.join(self.runfolder_path, self.samplesheet)
-        )
         experiments = []
-        for samplesheet_row in samplesheet_data:
-            experiment = NGIExperimentRef.from_samplesheet_row(samplesheet_row)
-            if all(
-                [
-                    experiment not in experiments,
-                    self.project_id is None
-                    or experiment.project.project_id == self.project_id,
-                    self.sample_id is None
-                    or experiment.sample.sample_id == self.sample_id,
-                ]
-            ):
-                experiments.append(experiment)
+        experiment_samplesheets = []
+        for samplesheet in self.samplesheets or [self.samplesheet]:
+            samplesheet_data = self._source.parse_samplesheet_data(
+                os.path.join(self.runfolder_path, samplesheet)
+            )
+            for samplesheet_row in samplesheet_data:
+                experiment = NGIExperimentRef.from_samplesheet_row(samplesheet_row)
+                if all(
+                    [
+                        experiment not in experiments,
+                        self.project_id is None
+                        or experiment.project.project_id == self.project_id,
+                        self.sample_id is None
+                        or experiment.sample.sample_id == self.sample_id,
+                    ]
+                ):
+                    experiments.append(experiment)
+                    experiment_samplesheets.append(samplesheet)
+
+        # an experiment present in several samplesheets is attributed to the first one, the
+        # samplesheet is recorded after de-duplicating so that it does not affect the comparison
+        if self.samplesheets:
+            for experiment, samplesheet in zip(experiments, experiment_samplesheets):
+                experiment.samplesheet = samplesheet
         return experiments
 
     def get_files_for_experiment_ref(
         self, experiment_ref: NGIExperimentRef
-    ) -> List[NGIFastqFile]:
+    ) -> Sequence[NGIFastqFile]:
         fastqdir = self.get_fastqdir_for_experiment_ref(experiment_ref)
+        # the files are stored with paths relative to the runfolder parent directory
+        reldir = os.path.relpath(fastqdir, os.path.dirname(self.runfolder_path))
         fastq_extensions = ["fastq.gz", "fastq", "fq.gz", "fq"]
-        fastqfiles = []
+        rows = []
+        checksum_file = self.get_checksumfile()
         for fastqfile in filter(
             lambda f: any(map(f.endswith, fastq_extensions)),
-            os.listdir(fastqdir),
+            self._source.listdir(fastqdir),
         ):
             fastqpath = os.path.join(fastqdir, fastqfile)
-            querypath = os.path.relpath(fastqpath, os.path.dirname(self.runfolder_path))
+            querypath = os.path.join(reldir, fastqfile)
             checksum = None
-            checksum_file = self.get_checksumfile()
             if checksum_file:
                 try:
-                    checksum = snpseq_metadata.utilities.lookup_checksum_from_file(
+                    checksum = self._source.lookup_checksum(
                         checksumfile=checksum_file, querypath=querypath
                     )
                 except OSError:
                     pass
             if checksum is None:
-                checksum = snpseq_metadata.utilities.calculate_checksum_from_file(
-                    queryfile=fastqpath, method=self.checksum_method
+                checksum = self._source.calculate_checksum(
+                    path=fastqpath, method=self.checksum_method
                 )
-            fastqfiles.append(
-                NGIFastqFile(
-                    filepath=fastqpath,
+            rows.append(
+                self._fastq_table.append(
+                    dirpath=reldir,
+                    filename=fastqfile,
                     checksum=checksum,
-                    checksum_method=self.checksum_method,
-                    relative_path=os.path.dirname(
-                        self.runfolder_path
-                    )
+                    size=self._source.file_size(fastqpath)
                 )
             )
-        return sorted(fastqfiles, key=lambda f: f.filepath)
+        # all files are in the same directory so sorting by name is sorting by path
+        return self._fastq_table.view(sorted(rows, key=self._fastq_table.filename))
 
     def get_sequencing_runs(self) -> List[NGIRun]:
+        experiments = self.get_experiments()
+        if self.shard:
+            # keep track of all experiments in order to be able to merge the shards later
+            self.experiment_aliases = [experiment.alias for experiment in experiments]
+            shard_index, shard_count = snpseq_metadata.utilities.parse_shard(self.shard)
+            experiments = [
+                experiment
+                for experiment in experiments
+                if snpseq_metadata.utilities.shard_for_key(
+                    experiment.alias, shard_count) == shard_index
+            ]
+        # let the source fetch the fastq directories (project, sample and files) up front
+        self._source.prefetch(
+            paths=[os.path.join(self.runfolder_path, d) for d in self.fastq_root_dirs],
+            max_depth=3
+        )
         return [
             self.get_sequencing_run_for_experiment_ref(experiment_ref=experiment_ref)
-            for experiment_ref in self.get_experiments()
+            for experiment_ref in experiments
         ]
 
     def get_sequencing_run_for_experiment_ref(
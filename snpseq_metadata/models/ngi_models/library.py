@@ -5,6 +5,7 @@ from snpseq_metadata.models.ngi_models.sample import NGISampleDescriptor
 from snpseq_metadata.models.ngi_models.pool import NGIPool
 from snpseq_metadata.models.ngi_models.library_design import \
     NGISource, NGIApplication, NGILibraryKit
+from snpseq_metadata.utilities import intern_value
 
 
 T = TypeVar("T", bound="NGILibrary")
@@ -71,12 +72,12 @@ class NGILibrary(NGIMetadataModel):
         pool = NGIPool.from_json(
             json_obj=json_obj.get("pool")
         )
-        description = json_obj.get("description")
+        description = intern_value(json_obj.get("description"))
         sample_type = NGISource.from_json(json_obj.get("sample_type"))
         application = NGIApplication.from_json(json_obj.get("application"))
         library_kit = NGILibraryKit.from_json(json_obj.get("library_kit"))
         layout = NGILibraryLayout.from_json(json_obj=json_obj.get("layout"))
-        library_protocol = json_obj.get("library_protocol")
+        library_protocol = intern_value(json_obj.get("library_protocol"))
         return cls(
             description=description,
             sample_type=sample_type,
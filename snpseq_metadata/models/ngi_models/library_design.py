@@ -1,7 +1,9 @@
 
-from typing import List, Type, TypeVar, Optional, ClassVar, Dict
+from functools import lru_cache
+from typing import Tuple, List, Type, TypeVar, Optional, ClassVar, Dict
 
 from snpseq_metadata.models.ngi_models.metadata_model import NGIMetadataModel
+from snpseq_metadata.utilities import intern_value
 
 A = TypeVar("A", bound="NGIObject")
 
@@ -28,27 +30,51 @@ class NGIObject(NGIMetadataModel):
             cls: Type[A],
             description: Optional[str],
     ) -> Optional[A]:
+        match_cls = cls.lookup_class(description)
+        return match_cls.shared(intern_value(description)) if match_cls else None
 
-        matches = list(
-            filter(
-                lambda m: m is not None,
-                map(
-                    lambda c: c.match(description),
-                    cls.__subclasses__()
-                )
-            )
-        )
-
-        # return the first match
-        if matches:
-            return matches[0]
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def lookup_class(
+            cls: Type[A],
+            description: Optional[str],
+    ) -> Optional[Type[A]]:
+        index, catch_all = cls.term_index()
+        if not description:
+            return catch_all
+        return index.get(cls.normalize_description(description), catch_all)
 
-        # if no subclass matched, check this class for matches. if "descriptions" is empty, it is the
-        # "top" class and nothing has matched so return the class representing e.g. "other"
-        if cls.match_terms(description) or not cls.descriptions:
-            return cls(description)
+    @classmethod
+    def match_order(cls: Type[A]) -> List[Type[A]]:
+        # the order in which the classes are tried when matching: the subclasses, depth-first
+        # and in order of definition, before the class itself
+        return [
+            match_cls
+            for subclass in cls.__subclasses__()
+            for match_cls in subclass.match_order()
+        ] + [cls]
 
-        return None
+    @classmethod
+    @lru_cache(maxsize=None)
+    def term_index(cls: Type[A]) -> Tuple[Dict[str, Type[A]], Optional[Type[A]]]:
+        # compile the class hierarchy, once, into a dict from normalized term to the first
+        # class in match order having the term. A class without terms matches anything, so it
+        # is returned as the catch-all and no classes after it can be matched
+        index = {}
+        for match_cls in cls.match_order():
+            if not match_cls.descriptions:
+                return index, match_cls
+            for term in match_cls.descriptions:
+                index.setdefault(cls.normalize_term(term), match_cls)
+        return index, None
+
+    @staticmethod
+    def normalize_term(term: str) -> str:
+        return term.lower().replace("-", " ").replace(" ", "")
+
+    @staticmethod
+    def normalize_description(description: str) -> str:
+        return description.lower().replace("rml-", "").replace("-", " ").replace(" ", "")
 
     @classmethod
     def match_terms(
@@ -56,9 +82,9 @@ class NGIObject(NGIMetadataModel):
             description: Optional[str],
     ) -> bool:
         return description and (
-                description.lower().replace("rml-", "").replace("-", " ").replace(" ", "") in
+                cls.normalize_description(description) in
                 [
-                    na.lower().replace("-", " ").replace(" ", "")
+                    cls.normalize_term(na)
                     for na in cls.descriptions
                 ]
         )
@@ -1,8 +1,9 @@
 import re
-from typing import ClassVar, Dict, Type, TypeVar
+from typing import ClassVar, Dict, List, Optional, Tuple, Type, TypeVar
 
 from snpseq_metadata.models.ngi_models.metadata_model import NGIMetadataModel
 from snpseq_metadata.exceptions import InstrumentModelNotRecognizedException
+from snpseq_metadata.utilities import intern_value
 
 T = TypeVar("T", bound="NGISequencingPlatform")
 
@@ -14,7 +15,7 @@ class NGISequencingPlatform(NGIMetadataModel):
 
     @classmethod
     def from_json(cls: Type[T], json_obj: Dict) -> T:
-        return cls(model_name=json_obj.get("model_name"))
+        return cls.shared(intern_value(json_obj.get("model_name")))
 
 
 class NGIIlluminaSequencingPlatform(NGISequencingPlatform):
@@ -31,15 +32,34 @@ class NGIIlluminaSequencingPlatform(NGISequencingPlatform):
 
     model_name_pattern: ClassVar[str] = r'^(\S+)\s*(X?)'
 
+    # patterns matching the InstrumentType in RunParameters.xml, in order of precedence
+    instrument_type_patterns: ClassVar[List[Tuple[str, str]]] = [
+        (r"novaseq\s*x", "NovaSeqX"),
+        (r"novaseq", "NovaSeq"),
+        (r"miseq", "MiSeq"),
+        (r"hiseq\s*x", "HiSeqX"),
+        (r"hiseq\s*2500", "HiSeq2500"),
+        (r"hiseq", "HiSeq"),
+        (r"iseq", "iSeq"),
+    ]
+
     def __init__(self, model_name: str) -> None:
-        model_name = model_name or ""
-        # match name against pattern
-        m = re.match(self.model_name_pattern, model_name)
-        model_name = model_name if not m else "".join(m.groups())
-        if model_name.lower() not in map(str.lower, self.model_dict.values()):
+        model_name = self.match_model_name(model_name)
+        if not self.is_recognized_model_name(model_name):
             raise InstrumentModelNotRecognizedException(needle=model_name)
         super().__init__(model_name)
 
+    @classmethod
+    def match_model_name(cls: Type[T], model_name: Optional[str]) -> str:
+        model_name = model_name or ""
+        # match name against pattern
+        m = re.match(cls.model_name_pattern, model_name)
+        return model_name if not m else "".join(m.groups())
+
+    @classmethod
+    def is_recognized_model_name(cls: Type[T], model_name: str) -> bool:
+        return model_name.lower() in map(str.lower, cls.model_dict.values())
+
     @classmethod
     def model_name_from_id(cls: Type[T], model_id: str) -> str:
         try:
@@ -53,3 +73,10 @@ class NGIIlluminaSequencingPlatform(NGISequencingPlatform):
             haystack=cls.model_dict,
             on_error=InstrumentModelNotRecognizedException,
         )
+
+    @classmethod
+    def model_name_from_instrument_type(cls: Type[T], instrument_type: str) -> str:
+        for pattern, model_name in cls.instrument_type_patterns:
+            if re.search(pattern, instrument_type, flags=re.IGNORECASE):
+                return model_name
+        raise InstrumentModelNotRecognizedException(needle=instrument_type)
@@ -1,6 +1,7 @@
 from typing import Dict, Type, TypeVar
 
 from snpseq_metadata.models.ngi_models.metadata_model import NGIMetadataModel
+from snpseq_metadata.utilities import intern_value
 
 T = TypeVar("T", bound="NGIStudyRef")
 
@@ -11,4 +12,4 @@ class NGIStudyRef(NGIMetadataModel):
 
     @classmethod
     def from_json(cls: Type[T], json_obj: Dict) -> T:
-        return cls(project_id=json_obj.get("project_id"))
+        return cls.shared(intern_value(json_obj.get("project_id")))
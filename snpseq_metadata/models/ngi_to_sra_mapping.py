@@ -1,5 +1,6 @@
 
-from typing import List, Type, TypeVar, Tuple, ClassVar
+from functools import lru_cache
+from typing import List, Optional, Type, TypeVar, Tuple, ClassVar
 
 
 from snpseq_metadata.models.ngi_models.library_design import (
@@ -184,14 +185,24 @@ class ModelMapper:
             application: NGIApplication,
             library_kit: NGILibraryKit,
     ) -> SRAObject:
+        sra_class = cls.library_class_for(type(source), type(application), type(library_kit))
+        if sra_class is not None:
+            return sra_class()
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def library_class_for(
+            cls: Type[A],
+            source_type: Type[NGISource],
+            application_type: Type[NGIApplication],
+            library_kit_type: Type[NGILibraryKit],
+    ) -> Optional[Type[SRAObject]]:
+        # the mappings only depend on the types of the library design objects, so the first
+        # matching mapping is looked up once per combination of types
+        query = (source_type, application_type, library_kit_type)
         for mapping in cls.library_mapping:
-            if cls.is_match((
-                    source,
-                    application,
-                    library_kit),
-                    mapping[0]
-            ):
-                return mapping[1]()
+            if all(q in m for q, m in zip(query, mapping[0])):
+                return mapping[1]
 
     @classmethod
     def is_match(
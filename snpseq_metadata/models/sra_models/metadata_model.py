@@ -50,6 +50,14 @@ class SRAMetadataModel(MetadataModel):
     def __getattr__(self, item: str) -> Optional[str]:
         return self.attribute_getter(self, item)
 
+    # the state is handled explicitly when pickling, since __getattr__ would otherwise be asked
+    # for the pickling methods, before the model object is set when unpickling
+    def __getstate__(self) -> Dict:
+        return dict(vars(self))
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+
     @staticmethod
     def attribute_getter(obj: T, item: str) -> Optional[str]:
         if item in obj.model_object.__dict__:
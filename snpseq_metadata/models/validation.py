@@ -0,0 +1,152 @@
+import logging
+from typing import ClassVar, Dict, Iterable, Iterator, List, Type, TypeVar
+
+from snpseq_metadata.models.lims_models import LIMSSample
+from snpseq_metadata.models.ngi_models import (
+    NGIApplication,
+    NGIIlluminaSequencingPlatform,
+    NGILibraryKit,
+    NGISource,
+)
+from snpseq_metadata.models.ngi_models.library_design import NGIObject
+
+V = TypeVar("V", bound="LIMSValidationReport")
+
+LOG = logging.getLogger(__name__)
+
+
+class LIMSValidationReport:
+    """
+    A report from validating LIMS samples against what the conversion to NGI models requires,
+    in one pass over the samples and without raising any exceptions. Samples with errors would
+    fail the conversion and can be skipped up front, whereas warnings, e.g. library terms that
+    only match the catch-all library design class, are informational.
+
+    Example:
+        report = LIMSValidationReport.from_samples(lims_container.samples)
+        valid_samples = report.valid_samples(lims_container.samples)
+    """
+
+    # the UDFs that must be present, or resolvable through an alias, for the conversion
+    required_udfs: ClassVar[List[str]] = [
+        "udf_sample_library_id",
+        "udf_sequencing_instrument",
+        "udf_application",
+        "udf_sample_type",
+        "udf_library_preparation_kit",
+    ]
+
+    # the library design classes that the library terms are matched against, indexed by UDF
+    library_term_classes: ClassVar[Dict[str, Type[NGIObject]]] = {
+        "udf_application": NGIApplication,
+        "udf_sample_type": NGISource,
+        "udf_library_preparation_kit": NGILibraryKit,
+    }
+
+    def __init__(self, sample_count: int) -> None:
+        self.sample_count = sample_count
+        self.errors = []
+        self.warnings = []
+        # the invalid samples are tracked by identity, since samples need not be hashable
+        self._invalid = set()
+
+    def add_error(self, sample: LIMSSample, field: str, value: object, reason: str) -> None:
+        self.errors.append(self._issue(sample, field, value, reason))
+        self._invalid.add(id(sample))
+
+    def add_warning(self, sample: LIMSSample, field: str, value: object, reason: str) -> None:
+        self.warnings.append(self._issue(sample, field, value, reason))
+
+    @staticmethod
+    def _issue(sample: LIMSSample, field: str, value: object, reason: str) -> Dict:
+        return {
+            "sample_name": sample.sample_name,
+            "sample_id": sample.sample_id,
+            "project_id": sample.project_id,
+            "field": field,
+            "value": value,
+            "reason": reason,
+        }
+
+    @classmethod
+    def from_samples(cls: Type[V], samples: List[LIMSSample]) -> V:
+        """
+        Validate LIMS samples, checking each requirement for all samples at once. Values shared
+        by many samples, e.g. instrument models and library terms, are only checked once.
+
+        :param samples: a list of LIMSSample objects
+        :return: a LIMSValidationReport for the samples
+        """
+        report = cls(sample_count=len(samples))
+
+        # check for missing UDFs
+        for udf in cls.required_udfs:
+            for sample in samples:
+                if not sample.has_udf(udf):
+                    report.add_error(sample, udf, None, "missing UDF")
+
+        # check that the instrument models are recognized
+        udf = "udf_sequencing_instrument"
+        recognized = {}
+        for sample in samples:
+            if not sample.has_udf(udf):
+                continue
+            value = getattr(sample, udf)
+            # only strings, or empty values, can be matched against the instrument models
+            if value and not isinstance(value, str):
+                report.add_error(sample, udf, value, "instrument model not recognized")
+                continue
+            value = value or ""
+            if value not in recognized:
+                recognized[value] = NGIIlluminaSequencingPlatform.is_recognized_model_name(
+                    NGIIlluminaSequencingPlatform.match_model_name(value)
+                )
+            if not recognized[value]:
+                report.add_error(sample, udf, value, "instrument model not recognized")
+
+        # check that the library terms match a library design class other than the catch-all
+        for udf, term_class in cls.library_term_classes.items():
+            for sample in samples:
+                if not sample.has_udf(udf):
+                    continue
+                value = str(getattr(sample, udf))
+                if value and term_class.lookup_class(value) is term_class:
+                    report.add_warning(sample, udf, value, "library term not matched")
+
+        return report
+
+    def is_valid(self, sample: LIMSSample) -> bool:
+        return id(sample) not in self._invalid
+
+    def valid_samples(self, samples: Iterable[LIMSSample]) -> Iterator[LIMSSample]:
+        return filter(self.is_valid, samples)
+
+    @property
+    def invalid_count(self) -> int:
+        return len(self._invalid)
+
+    def log(self) -> None:
+        # log the report as one message per severity, rather than one per sample
+        if self.errors:
+            LOG.error(
+                f"{self.invalid_count} of {self.sample_count} samples skipped - " +
+                "; ".join(self._format_issue(issue) for issue in self.errors)
+            )
+        if self.warnings:
+            LOG.warning(
+                f"{len(self.warnings)} library terms not matched - " +
+                "; ".join(self._format_issue(issue) for issue in self.warnings)
+            )
+
+    @staticmethod
+    def _format_issue(issue: Dict) -> str:
+        value = "" if issue["value"] is None else f" '{issue['value']}'"
+        return f"LIMSSample: '{issue['sample_name']}' {issue['field']}{value}: {issue['reason']}"
+
+    def to_json(self) -> Dict:
+        return {
+            "samples": self.sample_count,
+            "invalid_samples": self.invalid_count,
+            "errors": self.errors,
+            "warnings": self.warnings,
+        }
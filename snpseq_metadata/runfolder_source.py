@@ -0,0 +1,345 @@
+import concurrent.futures
+import os
+import tarfile
+from typing import Dict, IO, List, Optional, Set, Tuple, Type, TypeVar
+
+import snpseq_metadata.utilities
+
+R = TypeVar("R", bound="RunfolderSource")
+
+
+class RunfolderSource:
+    """
+    Provides access to the contents of a runfolder. This default implementation accesses the
+    runfolder directly on the file system, subclasses can provide the same contents from other
+    sources, e.g. an archive.
+
+    All paths passed to the methods are full paths, i.e. joined with the runfolder_path.
+
+    The file system operations performed are recorded in the statistics attribute.
+    """
+
+    def __init__(self, runfolder_path: str) -> None:
+        self.runfolder_path = runfolder_path
+        self.statistics = snpseq_metadata.utilities.FilesystemStatistics()
+        self._checksum_indexes = {}
+
+    @classmethod
+    def from_path(cls: Type[R], path: str, max_workers: Optional[int] = None) -> R:
+        """
+        Create a suitable RunfolderSource for the supplied path
+
+        :param path: path to a runfolder directory or a tar archive of a runfolder
+        :param max_workers: if specified, the directories of a runfolder on disk will be
+        scanned concurrently by this number of threads
+        :return: an instance of RunfolderSource or any of its subclasses
+        """
+        if os.path.isfile(path) and TarRunfolderSource.is_tar_archive(path):
+            return TarRunfolderSource(tar_path=path)
+        if max_workers:
+            return ConcurrentRunfolderSource(runfolder_path=path, max_workers=max_workers)
+        return cls(runfolder_path=path)
+
+    def prefetch(self, paths: List[str], max_depth: Optional[int] = None) -> None:
+        """
+        Hint that the directory trees below the supplied paths will be accessed. The default
+        implementation does nothing.
+
+        :param paths: paths to the directories that will be accessed
+        :param max_depth: the number of directory levels, including the supplied directories,
+        that will be accessed
+        """
+        pass
+
+    def listdir(self, path: str) -> List[str]:
+        with self.statistics.measure("listdir"):
+            return os.listdir(path)
+
+    def isdir(self, path: str) -> bool:
+        with self.statistics.measure("isdir"):
+            return os.path.isdir(path)
+
+    def exists(self, path: str) -> bool:
+        with self.statistics.measure("exists"):
+            return os.path.exists(path)
+
+    def open(self, path: str, mode: str = "r") -> IO:
+        # the file is opened in binary mode, so that the bytes read are counted
+        with self.statistics.measure("open"):
+            return self.statistics.measure_file(
+                open(path, mode.replace("b", "") + "b"),
+                text="b" not in mode
+            )
+
+    def file_size(self, path: str) -> Optional[int]:
+        # the size of a file, if it is known without additional file system access
+        return None
+
+    def parse_samplesheet_data(self, samplesheet: str) -> List[Dict[str, str]]:
+        with self.statistics.measure("samplesheet"):
+            return snpseq_metadata.utilities.parse_samplesheet_data(
+                samplesheet, open_file=self.open
+            )
+
+    def calculate_checksum(self, path: str, method: str) -> str:
+        # the file data is streamed into the hasher
+        with self.statistics.measure("checksum"):
+            with self.open(path, mode="rb") as fh:
+                return snpseq_metadata.utilities.calculate_checksum_from_stream(fh, method)
+
+    def lookup_checksum(self, checksumfile: str, querypath: str) -> Optional[str]:
+        # the checksum file is only parsed once and the index is then re-used for all lookups
+        if checksumfile not in self._checksum_indexes:
+            with self.open(checksumfile) as fh:
+                self._checksum_indexes[checksumfile] = \
+                    snpseq_metadata.utilities.parse_checksum_file(fh)
+        return self._checksum_indexes[checksumfile].get(querypath)
+
+
+class TarRunfolderSource(RunfolderSource):
+    """
+    Provides access to the contents of a runfolder stored in a tar archive, without extracting
+    it. The runfolder is presented as if the archive had been extracted next to it, e.g. the
+    archive /archive/210415_A00001_0123_BXYZ321XY.tar is presented as the runfolder
+    /archive/210415_A00001_0123_BXYZ321XY.
+
+    The members of the archive may be stored either with or without the runfolder name as the
+    top-level directory.
+    """
+
+    tar_extensions = [".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz"]
+
+    def __init__(self, tar_path: str) -> None:
+        self.tar_path = tar_path
+        runfolder_name = self.runfolder_name_from_tar_path(tar_path)
+        super().__init__(
+            runfolder_path=os.path.join(os.path.dirname(tar_path), runfolder_name)
+        )
+        self._tarfile: Optional[tarfile.TarFile] = None
+        self._members: Dict[str, tarfile.TarInfo] = {}
+        self._children: Dict[str, Set[str]] = {}
+
+    def __getstate__(self) -> Dict:
+        # the open archive can not be pickled, it is opened and indexed again when needed
+        state = dict(vars(self))
+        state.update(_tarfile=None, _members={}, _children={})
+        return state
+
+    @classmethod
+    def is_tar_archive(cls, path: str) -> bool:
+        return any(map(path.lower().endswith, cls.tar_extensions))
+
+    @classmethod
+    def runfolder_name_from_tar_path(cls, tar_path: str) -> str:
+        # the name of the archive without the extension
+        runfolder_name = os.path.basename(tar_path)
+        for extension in sorted(cls.tar_extensions, key=len, reverse=True):
+            if runfolder_name.lower().endswith(extension):
+                return runfolder_name[:-len(extension)]
+        return runfolder_name
+
+    def close(self) -> None:
+        if self._tarfile is not None:
+            self._tarfile.close()
+            self._tarfile = None
+
+    def _index(self) -> tarfile.TarFile:
+        # read the member headers once and index them by the path they would have on disk
+        if self._tarfile is None:
+            with self.statistics.measure("open"):
+                self._tarfile = tarfile.open(self.tar_path)
+            runfolder_name = os.path.basename(self.runfolder_path)
+            parent_path = os.path.dirname(self.runfolder_path)
+            self._children = {self.runfolder_path: set()}
+            for member in self._tarfile:
+                name = os.path.normpath(member.name).lstrip("/")
+                if name == ".":
+                    continue
+                if name.split("/")[0] == runfolder_name:
+                    path = os.path.join(parent_path, name)
+                else:
+                    path = os.path.join(self.runfolder_path, name)
+                self._members[path] = member
+                if member.isdir():
+                    self._children.setdefault(path, set())
+                # make sure that all parent directories are indexed, even if the archive lacks
+                # explicit members for them
+                while path != self.runfolder_path and path != parent_path:
+                    parent = os.path.dirname(path)
+                    self._children.setdefault(parent, set()).add(os.path.basename(path))
+                    path = parent
+        return self._tarfile
+
+    def listdir(self, path: str) -> List[str]:
+        self._index()
+        try:
+            return list(self._children[os.path.normpath(path)])
+        except KeyError:
+            raise FileNotFoundError(f"No such directory in {self.tar_path}: '{path}'")
+
+    def isdir(self, path: str) -> bool:
+        self._index()
+        return os.path.normpath(path) in self._children
+
+    def exists(self, path: str) -> bool:
+        self._index()
+        path = os.path.normpath(path)
+        return path in self._members or path in self._children
+
+    def open(self, path: str, mode: str = "r") -> IO:
+        tar = self._index()
+        with self.statistics.measure("open"):
+            try:
+                fh = tar.extractfile(self._members[os.path.normpath(path)])
+            except KeyError:
+                fh = None
+        if fh is None:
+            raise FileNotFoundError(f"No such file in {self.tar_path}: '{path}'")
+        return self.statistics.measure_file(fh, text="b" not in mode, encoding="utf-8")
+
+    def file_size(self, path: str) -> Optional[int]:
+        self._index()
+        member = self._members.get(os.path.normpath(path))
+        return member.size if member is not None and member.isfile() else None
+
+    def parse_samplesheet_data(self, samplesheet: str) -> List[Dict[str, str]]:
+        with self.statistics.measure("samplesheet"), self.open(samplesheet) as fh:
+            return snpseq_metadata.utilities.parse_samplesheet_data_from_stream(
+                fh, samplesheet
+            )
+
+
+class ListingRunfolderSource(RunfolderSource):
+    """
+    Provides the directory structure of a runfolder from a precomputed listing of the files in
+    it, e.g. exported from the storage system, so that no directories need to be listed or
+    checked. Files are still opened directly on the file system, when needed.
+
+    The listing is a tab-separated text file with one file per line and the columns path, size
+    and mtime, optionally followed by a checksum of the file. The path is either absolute or
+    relative to the runfolder. Directories are inferred from the file paths. Empty lines and
+    lines starting with '#' are ignored.
+    """
+
+    def __init__(self, runfolder_path: str, listing_file: str) -> None:
+        super().__init__(runfolder_path=runfolder_path)
+        self.listing_file = listing_file
+        self._files: Dict[str, Tuple[int, float, Optional[str]]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._index()
+
+    def _index(self) -> None:
+        runfolder_path = os.path.normpath(self.runfolder_path)
+        self._children = {runfolder_path: set()}
+        with self.open(self.listing_file) as fh:
+            for row in fh:
+                if not row.strip() or row.startswith("#"):
+                    continue
+                splits = row.rstrip("\r\n").split("\t")
+                path = os.path.normpath(os.path.join(runfolder_path, splits[0]))
+                checksum = splits[3] if len(splits) > 3 and splits[3] else None
+                self._files[path] = (int(splits[1]), float(splits[2]), checksum)
+                # register the file and its parent directories, up to the runfolder
+                while path != runfolder_path and path != os.path.dirname(path):
+                    parent = os.path.dirname(path)
+                    self._children.setdefault(parent, set()).add(os.path.basename(path))
+                    path = parent
+
+    def listdir(self, path: str) -> List[str]:
+        try:
+            return list(self._children[os.path.normpath(path)])
+        except KeyError:
+            raise FileNotFoundError(f"No such directory in {self.listing_file}: '{path}'")
+
+    def isdir(self, path: str) -> bool:
+        return os.path.normpath(path) in self._children
+
+    def exists(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        return path in self._files or path in self._children
+
+    def file_size(self, path: str) -> Optional[int]:
+        return self._files.get(os.path.normpath(path), (None, None, None))[0]
+
+    def calculate_checksum(self, path: str, method: str) -> str:
+        # use the checksum from the listing, if available
+        checksum = self._files.get(os.path.normpath(path), (None, None, None))[2]
+        return checksum or super().calculate_checksum(path=path, method=method)
+
+
+class ConcurrentRunfolderSource(RunfolderSource):
+    """
+    Accesses the runfolder directly on the file system but lists the directory trees passed to
+    prefetch concurrently from a pool of threads and caches the result. On high-latency file
+    systems, e.g. NFS mounts, this avoids waiting for one round trip at a time.
+
+    Directories that have not been prefetched are listed on demand, as with RunfolderSource.
+    """
+
+    def __init__(self, runfolder_path: str, max_workers: int = 8) -> None:
+        super().__init__(runfolder_path=runfolder_path)
+        self.max_workers = max_workers
+        self._listings: Dict[str, List[str]] = {}
+        self._dirs: Set[str] = set()
+
+    def _scandir(self, path: str) -> List[Tuple[str, bool]]:
+        # the entry type is usually provided by the directory listing itself, without a stat
+        with self.statistics.measure("listdir"), os.scandir(path) as entries:
+            return [(entry.name, entry.is_dir()) for entry in entries]
+
+    def _add_listing(self, path: str, entries: List[Tuple[str, bool]]) -> List[str]:
+        self._listings[path] = [name for name, _ in entries]
+        self._dirs.add(path)
+        self._dirs.update(os.path.join(path, name) for name, is_dir in entries if is_dir)
+        return self._listings[path]
+
+    def prefetch(self, paths: List[str], max_depth: Optional[int] = None) -> None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {
+                executor.submit(self._scandir, path): (path, 1)
+                for path in map(os.path.normpath, paths)
+                if path not in self._listings
+            }
+            # submit the subdirectories as soon as their parent has been listed
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    path, depth = pending.pop(future)
+                    try:
+                        entries = future.result()
+                    except OSError:
+                        continue
+                    self._add_listing(path, entries)
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    for name, is_dir in entries:
+                        subdir = os.path.join(path, name)
+                        if is_dir and subdir not in self._listings:
+                            pending[executor.submit(self._scandir, subdir)] = \
+                                (subdir, depth + 1)
+
+    def listdir(self, path: str) -> List[str]:
+        path = os.path.normpath(path)
+        if path in self._listings:
+            return list(self._listings[path])
+        return list(self._add_listing(path, self._scandir(path)))
+
+    def isdir(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        if path in self._dirs:
+            return True
+        # if the parent has been listed, the path is either not a directory or does not exist
+        if os.path.dirname(path) in self._listings:
+            return False
+        return super().isdir(path)
+
+    def exists(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        if path in self._dirs:
+            return True
+        parent = os.path.dirname(path)
+        if parent in self._listings:
+            return os.path.basename(path) in self._listings[parent]
+        return super().exists(path)
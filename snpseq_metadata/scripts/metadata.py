@@ -1,12 +1,25 @@
 import click
+import concurrent.futures
+import contextlib
 import csv
 import json
 import os
+import sys
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+import snpseq_metadata.utilities
 
 from snpseq_metadata.models.ngi_models import NGIFlowcell, NGIExperimentSet
-from snpseq_metadata.models.lims_models import LIMSSequencingContainer
+from snpseq_metadata.models.lims_models import LIMSSample, LIMSSequencingContainer
 from snpseq_metadata.models.sra_models import SRAMetadataModel
-from snpseq_metadata.models.converter import Converter, ConvertExperimentSet
+from snpseq_metadata.models.converter import (
+    ConvertExperimentSet,
+    ConverterStatistics,
+    ConvertRunSet,
+    SRAConversionCache,
+)
+from snpseq_metadata.models.validation import LIMSValidationReport
+from snpseq_metadata.runfolder_source import ListingRunfolderSource, RunfolderSource
 
 
 def common_options(function):
@@ -20,6 +33,43 @@ def common_options(function):
     return function
 
 
+def threads_option(function):
+    function = click.option(
+        "-t",
+        "--threads",
+        type=int,
+        default=None,
+        help="number of threads listing the runfolder directories concurrently, useful on "
+             "high-latency file systems",
+    )(function)
+    return function
+
+
+class VariadicArgumentParsing(click.Command):
+    # used together with a chained click.Group, e.g. class G(click.Group, VariadicArgumentParsing),
+    # so that a variadic argument of the group ends at the first subcommand rather than consuming
+    # all the remaining arguments
+    def parse_args(self, ctx: click.Context, args: List[str]) -> List[str]:
+        commands = getattr(self, "commands", {})
+        index = next((i for i, arg in enumerate(args) if arg in commands), len(args))
+        return super().parse_args(ctx, args[:index]) + args[index:]
+
+
+class VariadicArgumentGroup(click.Group, VariadicArgumentParsing):
+    pass
+
+
+def validation_report_option(function):
+    function = click.option(
+        "--validation-report",
+        type=click.Path(dir_okay=False, writable=True),
+        default=None,
+        help="write a json report of the samples that could not be converted and of the "
+             "library terms that were not matched to this file",
+    )(function)
+    return function
+
+
 @click.group()
 def metadata():
     pass
@@ -30,37 +80,309 @@ def extract():
     pass
 
 
+def validate_shard(ctx, param, value):
+    if value is not None:
+        try:
+            snpseq_metadata.utilities.parse_shard(value)
+        except ValueError as ex:
+            raise click.BadParameter(str(ex))
+    return value
+
+
 @click.group(chain=True)
 @common_options
+@click.option(
+    "--shard",
+    callback=validate_shard,
+    default=None,
+    help="only extract the subset i/n of the experiments, e.g. 1/4",
+)
+@click.option(
+    "--listing",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    help="tab-separated listing of the files in the runfolder (path, size, mtime and "
+         "optionally checksum), used instead of listing the directories on disk",
+)
+@threads_option
+@click.option(
+    "--stats",
+    is_flag=True,
+    default=False,
+    help="report the number of and the time spent in file system operations",
+)
 @click.argument("runfolder_path", nargs=1, type=click.Path(exists=True, dir_okay=True))
-def runfolder(outdir, runfolder_path):
+def runfolder(outdir, shard, listing, threads, stats, runfolder_path):
     pass
 
 
 @click.group(chain=True)
 @common_options
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    default=None,
+    help="number of runfolders to extract in parallel [default: number of CPUs]",
+)
+@threads_option
+@click.argument(
+    "runfolders_source",
+    nargs=1,
+    type=click.Path(exists=True, dir_okay=True, file_okay=True)
+)
+def runfolders(outdir, processes, threads, runfolders_source):
+    pass
+
+
+@click.group(chain=True, cls=VariadicArgumentGroup)
+@common_options
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="parse, convert and write the samples one at a time, keeping memory usage flat "
+         "for large exports",
+)
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    default=None,
+    help="number of processes converting chunks of samples in parallel, useful for large "
+         "exports [default: convert in a single process]",
+)
+@validation_report_option
+@click.argument(
+    "snpseq_data_files",
+    metavar="SNPSEQ_DATA_FILE...",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=True)
+)
+def snpseq_data(outdir, stream, processes, validation_report, snpseq_data_files):
+    pass
+
+
+def parse_column_mapping(ctx, param, value):
+    column_mapping = {}
+    for field_column in value:
+        field, sep, column = field_column.partition("=")
+        if not (field and sep and column):
+            raise click.BadParameter(f"'{field_column}' is not on the form FIELD=COLUMN")
+        column_mapping[field] = column
+    return column_mapping
+
+
+@click.group(chain=True, cls=VariadicArgumentGroup)
+@common_options
+@click.option(
+    "--name",
+    default=None,
+    help="name of the sequencing container [default: read from the flowcell_id column]",
+)
+@click.option(
+    "-c",
+    "--column",
+    "column_mapping",
+    multiple=True,
+    callback=parse_column_mapping,
+    metavar="FIELD=COLUMN",
+    help="read the snpseq-data FIELD from COLUMN of the csv, can be given multiple times",
+)
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    default=None,
+    help="number of processes converting chunks of samples in parallel, useful for large "
+         "exports [default: convert in a single process]",
+)
+@validation_report_option
 @click.argument(
-    "snpseq_data_file", nargs=1, type=click.Path(exists=True, file_okay=True)
+    "lims_csv_files",
+    metavar="LIMS_CSV_FILE...",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=True)
 )
-def snpseq_data(outdir, snpseq_data_file):
+def lims_csv(outdir, name, column_mapping, processes, validation_report, lims_csv_files):
     pass
 
 
 @runfolder.result_callback()
-def extract_runfolder(processors, outdir, runfolder_path):
-    ngi_flowcell = NGIFlowcell(runfolder_path=runfolder_path)
+def extract_runfolder(processors, outdir, shard, listing, threads, stats, runfolder_path):
+    if listing:
+        source = ListingRunfolderSource(runfolder_path=runfolder_path, listing_file=listing)
+    else:
+        source = RunfolderSource.from_path(runfolder_path, max_workers=threads)
+    ngi_flowcell = NGIFlowcell(
+        runfolder_path=source.runfolder_path,
+        shard=shard,
+        source=source
+    )
     outfile_prefix = os.path.join(outdir, ngi_flowcell.runfolder_name)
+    if shard:
+        outfile_prefix = f"{outfile_prefix}.shard-{shard.replace('/', '-of-')}"
     for processor in processors:
         processor(ngi_flowcell, outfile_prefix)
+    if stats:
+        print(ngi_flowcell.filesystem_statistics.report())
 
 
-@snpseq_data.result_callback()
-def extract_snpseq_data(processors, outdir, snpseq_data_file):
+def _parse_runfolder(
+        runfolder_path: str,
+        threads: Optional[int] = None
+) -> Tuple[Optional[NGIFlowcell], Optional[str]]:
+    # exceptions are passed back as strings since not all of them can be pickled
+    try:
+        source = RunfolderSource.from_path(runfolder_path, max_workers=threads)
+        return NGIFlowcell(runfolder_path=source.runfolder_path, source=source), None
+    except Exception as ex:
+        return None, str(ex) or repr(ex)
+
+
+@runfolders.result_callback()
+def extract_runfolders(processors, outdir, processes, threads, runfolders_source):
+    runfolder_paths = snpseq_metadata.utilities.find_runfolders(
+        runfolders_source,
+        pattern=NGIFlowcell.runfolder_name_pattern
+    )
+    failures = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(_parse_runfolder, runfolder_path, threads): runfolder_path
+            for runfolder_path in runfolder_paths
+        }
+        # write the results as they become available. Errors outside of the parsing, e.g. a
+        # result that can not be pickled, a worker process that was killed or an output that
+        # could not be written, fail the runfolder but not the rest of the batch
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                ngi_flowcell, error = future.result()
+            except Exception as ex:
+                ngi_flowcell, error = None, str(ex) or repr(ex)
+            if ngi_flowcell is None:
+                failures.append((futures[future], error))
+                continue
+            outfile_prefix = os.path.join(outdir, ngi_flowcell.runfolder_name)
+            try:
+                for processor in processors:
+                    processor(ngi_flowcell, outfile_prefix)
+            except Exception as ex:
+                failures.append((futures[future], str(ex) or repr(ex)))
+
+    failures_file = os.path.join(outdir, "runfolders.failures.tsv")
+    with open(failures_file, "w", newline="") as fh:
+        w = csv.writer(fh, dialect=csv.excel_tab)
+        w.writerow(["runfolder", "reason"])
+        w.writerows(sorted(failures))
+    print(
+        f"Extracted {len(runfolder_paths) - len(failures)} of {len(runfolder_paths)} "
+        f"runfolders, {len(failures)} failed (see {failures_file})"
+    )
+
+
+def _load_lims_container(snpseq_data_file: str) -> LIMSSequencingContainer:
     with open(snpseq_data_file, "rb") as fh:
-        lims_experiments = LIMSSequencingContainer.from_json(json.load(fh))
-        ngi_experiments = ConvertExperimentSet.lims_to_ngi(lims_model=lims_experiments)
+        return LIMSSequencingContainer.from_json(json.load(fh))
+
+
+def _iter_lims_samples(snpseq_data_files: Tuple[str, ...]) -> Iterator[LIMSSample]:
+    for snpseq_data_file in snpseq_data_files:
+        with open(snpseq_data_file) as fh:
+            yield from LIMSSequencingContainer.iter_samples(fh)
+
+
+def _validate_lims_containers(
+        lims_containers: List[LIMSSequencingContainer],
+        validation_report_file: Optional[str] = None
+) -> LIMSValidationReport:
+    # validate the samples of all containers in one report, which is logged once
+    validation_report = LIMSValidationReport.from_samples(
+        [sample for lims_container in lims_containers for sample in lims_container.samples or []]
+    )
+    validation_report.log()
+    if validation_report_file:
+        with open(validation_report_file, "w") as fh:
+            json.dump(validation_report.to_json(), fh, indent=2)
+    return validation_report
+
+
+@snpseq_data.result_callback()
+def extract_snpseq_data(
+        processors, outdir, stream, processes, validation_report, snpseq_data_files
+):
+    # the output is named after the first file, the experiments from all files are merged into it
     outfile_prefix = os.path.join(
-        outdir, ".".join(os.path.basename(snpseq_data_file).split(".")[0:-1])
+        outdir, ".".join(os.path.basename(snpseq_data_files[0]).split(".")[0:-1])
+    )
+    if stream:
+        # the experiments are generated as the processor consumes them, so they can only be
+        # processed once
+        if len(processors) > 1:
+            raise click.UsageError("only one output format can be used with --stream")
+        if validation_report:
+            raise click.UsageError("--validation-report can not be used with --stream")
+        experiments = ConvertExperimentSet.lims_samples_to_ngi(
+            _iter_lims_samples(snpseq_data_files),
+            processes=processes
+        )
+        if len(snpseq_data_files) > 1:
+            experiments = NGIExperimentSet.unique_experiments(experiments)
+        ngi_experiments = NGIExperimentSet(experiments=experiments)
+        for processor in processors:
+            processor(ngi_experiments, outfile_prefix)
+        return
+
+    # the files are loaded one after another and merged in the order they were given
+    lims_containers = [
+        _load_lims_container(snpseq_data_file) for snpseq_data_file in snpseq_data_files
+    ]
+    report = _validate_lims_containers(lims_containers, validation_report)
+    ngi_experiment_sets = [
+        ConvertExperimentSet.lims_to_ngi(
+            lims_model=lims_experiments,
+            processes=processes,
+            validation_report=report
+        )
+        for lims_experiments in lims_containers
+    ]
+    if len(ngi_experiment_sets) == 1:
+        ngi_experiments = ngi_experiment_sets[0]
+    else:
+        ngi_experiments = NGIExperimentSet.merge(ngi_experiment_sets)
+    for processor in processors:
+        processor(ngi_experiments, outfile_prefix)
+
+
+def _iter_csv_files(csv_files: Tuple[str, ...]) -> Iterator[TextIO]:
+    for csv_file in csv_files:
+        with open(csv_file, newline="") as fh:
+            yield fh
+
+
+@lims_csv.result_callback()
+def extract_lims_csv(
+        processors, outdir, name, column_mapping, processes, validation_report, lims_csv_files
+):
+    lims_experiments = LIMSSequencingContainer.from_csv(
+        _iter_csv_files(lims_csv_files),
+        name=name,
+        column_mapping=column_mapping
+    )
+    # the output is named as it would have been for a snpseq-data export of the container, or
+    # after the first file if the container has no name
+    if lims_experiments.name:
+        outfile_prefix = os.path.join(outdir, f"snpseq_data_{lims_experiments.name}")
+    else:
+        outfile_prefix = os.path.join(
+            outdir, ".".join(os.path.basename(lims_csv_files[0]).split(".")[0:-1])
+        )
+    ngi_experiments = ConvertExperimentSet.lims_to_ngi(
+        lims_model=lims_experiments,
+        processes=processes,
+        validation_report=_validate_lims_containers([lims_experiments], validation_report)
     )
     for processor in processors:
         processor(ngi_experiments, outfile_prefix)
@@ -71,25 +393,122 @@ def extract_to_json():
     def processor(ngi_object, outfile_prefix):
         outfile = f"{outfile_prefix}.ngi.json"
         with open(outfile, "w") as fh:
-            json.dump(ngi_object.to_json(), fh, indent=2)
+            # experiment sets are written incrementally
+            if isinstance(ngi_object, NGIExperimentSet):
+                ngi_object.dump_json(fh, indent=2)
+            else:
+                json.dump(ngi_object.to_json(), fh, indent=2)
 
     return processor
 
 
+@click.command()
+@common_options
+@click.argument("shard_files", nargs=-1, required=True, type=click.File("rb"))
+def merge(outdir, shard_files):
+    shards = [
+        NGIFlowcell.from_json(json_obj=json.load(shard_file))
+        for shard_file in shard_files
+    ]
+    ngi_flowcell = NGIFlowcell.merge(shards)
+    outfile = os.path.join(outdir, f"{ngi_flowcell.runfolder_name}.ngi.json")
+    with open(outfile, "w") as fh:
+        json.dump(ngi_flowcell.to_json(), fh, indent=2)
+
+
 @click.group(chain=True)
 @common_options
+@click.option(
+    "--from-lims",
+    is_flag=True,
+    help="SNPSEQ_DATA is a LIMS export from the snpseq-data service, which is converted "
+         "directly instead of through the NGI json created by extract snpseq-data"
+)
+@click.option(
+    "--profile",
+    type=click.Choice(["table", "json"]),
+    default=None,
+    help="report the number of calls to, the time spent in and the failures of the "
+         "conversions made by each converter, as a table or as json",
+)
+@click.option(
+    "-p",
+    "--processes",
+    type=int,
+    default=None,
+    help="number of processes converting chunks of runs and experiments in parallel, used "
+         "for large flowcells [default: convert in a single process]",
+)
+@click.option(
+    "--previous",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    default=None,
+    help="output directory of a previous export made with --save-cache, whose conversions "
+         "are reused for the runs and experiments that have not changed since. The cache in "
+         "it is unpickled, so it must be a trusted directory",
+)
+@click.option(
+    "--save-cache",
+    is_flag=True,
+    help=f"save the converted runs and experiments to {SRAConversionCache.file_name} in "
+         f"OUTDIR, for a later export with --previous",
+)
 @click.argument("runfolder_data", nargs=1, type=click.File("rb"))
 @click.argument("snpseq_data", nargs=1, type=click.File("rb"))
-def export(outdir, runfolder_data, snpseq_data):
+def export(
+        outdir, from_lims, profile, processes, previous, save_cache, runfolder_data, snpseq_data
+):
     pass
 
 
 @export.result_callback()
-def export_pipeline(processors, outdir, runfolder_data, snpseq_data):
+def export_pipeline(
+        processors,
+        outdir,
+        from_lims,
+        profile,
+        processes,
+        previous,
+        save_cache,
+        runfolder_data,
+        snpseq_data
+):
     ngi_flowcell = NGIFlowcell.from_json(json_obj=json.load(runfolder_data))
-    ngi_experiments = NGIExperimentSet.from_json(json_obj=json.load(snpseq_data))
-    sra_run_set = Converter.ngi_to_sra(ngi_model=ngi_flowcell)
-    sra_experiment_set = Converter.ngi_to_sra(ngi_experiments)
+    # the conversions are only cached when reusing or saving them, since the models are hashed
+    cache = SRAConversionCache.load(previous) if previous else None
+    if save_cache and cache is None:
+        cache = SRAConversionCache()
+    # the conversions are only measured when profiling
+    profiling = ConverterStatistics.collect() if profile else contextlib.nullcontext()
+    with profiling as statistics:
+        sra_run_set = ConvertRunSet.ngi_to_sra(
+            ngi_model=ngi_flowcell,
+            processes=processes,
+            cache=cache
+        )
+        if from_lims:
+            lims_experiments = LIMSSequencingContainer.from_json(json_obj=json.load(snpseq_data))
+            sra_experiment_set = ConvertExperimentSet.lims_to_sra(
+                lims_model=lims_experiments,
+                processes=processes,
+                cache=cache
+            )
+        else:
+            ngi_experiments = NGIExperimentSet.from_json(json_obj=json.load(snpseq_data))
+            sra_experiment_set = ConvertExperimentSet.ngi_to_sra(
+                ngi_model=ngi_experiments,
+                processes=processes,
+                cache=cache
+            )
+    if save_cache:
+        cache.save(outdir)
+    if previous:
+        # written to stderr, so that stdout is only the profile when it is reported as json
+        print(
+            f"Reused {cache.hits} and converted {cache.misses} runs and experiments from "
+            f"{previous}",
+            file=sys.stderr
+        )
 
     projects = list(set(map(lambda exp: exp.study_ref, sra_experiment_set.experiments)))
     for project in projects:
@@ -101,6 +520,10 @@ def export_pipeline(processors, outdir, runfolder_data, snpseq_data):
         )
         for processor in processors:
             processor(str(project), project_experiment_set, project_run_set, outdir)
+    if profile == "json":
+        print(json.dumps(statistics.to_json(), indent=2))
+    elif profile:
+        print(statistics.report())
 
 
 @click.command("xml")
@@ -202,10 +625,15 @@ export.add_command(to_tsv)
 metadata.add_command(export)
 
 snpseq_data.add_command(extract_to_json)
+lims_csv.add_command(extract_to_json)
 runfolder.add_command(extract_to_json)
+runfolders.add_command(extract_to_json)
 extract.add_command(snpseq_data)
+extract.add_command(lims_csv)
 extract.add_command(runfolder)
+extract.add_command(runfolders)
 metadata.add_command(extract)
+metadata.add_command(merge)
 
 
 def entry_point():
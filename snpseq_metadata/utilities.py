@@ -1,9 +1,22 @@
+import collections
+import contextlib
 import csv
+import datetime
 import hashlib
+import io
+import itertools
+import json
 import logging
 import os
+import re
+import sys
+import threading
+import time
 from functools import wraps
-from typing import Dict, List, Optional
+from typing import (
+    BinaryIO, Callable, Dict, IO, Iterable, Iterator, List, Optional, TextIO, Tuple
+)
+from xml.etree import ElementTree
 
 from snpseq_metadata.exceptions import (
     NoSampleSheetDataFoundException,
@@ -15,14 +28,23 @@ from snpseq_metadata.exceptions import (
 log = logging.getLogger(__name__)
 
 
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
 def calculate_checksum_from_file(queryfile: str, method: str) -> str:
+    with open(queryfile, "rb") as fh:
+        return calculate_checksum_from_stream(fh, method)
+
+
+def calculate_checksum_from_stream(fh: BinaryIO, method: str) -> str:
     if method == "MD5":
         hasher = hashlib.md5()
     else:
         hasher = hashlib.new(method)
 
-    with open(queryfile, "rb") as fh:
-        hasher.update(fh.read())
+    # read the data in chunks in order to not keep large files in memory
+    for chunk in iter(lambda: fh.read(CHECKSUM_CHUNK_SIZE), b""):
+        hasher.update(chunk)
     return hasher.hexdigest()
 
 
@@ -34,47 +56,486 @@ def lookup_checksum_from_file(checksumfile: str, querypath: str) -> Optional[str
                 return splits[0]
 
 
-def parse_samplesheet_data(samplesheet: str) -> List[Dict[str, str]]:
-    with open(samplesheet) as fh:
-        row = ""
+def parse_checksum_file(fh: TextIO) -> Dict[str, str]:
+    # index the checksums by path, the first entry for a path takes precedence
+    checksums = {}
+    for row in fh:
+        splits = row.split()
+        if len(splits) == 2:
+            checksums.setdefault(splits[1], splits[0])
+    return checksums
+
+
+SAMPLESHEET_DATA_SECTIONS = ["Data", "BCLConvert_Data"]
+
+
+SAMPLESHEET_CACHE_SIZE = 128
+# the parsed samplesheets, indexed by path, mtime and size, in order of use
+_samplesheet_cache: "collections.OrderedDict[Tuple[str, int, int], List[Dict[str, str]]]" = \
+    collections.OrderedDict()
+_samplesheet_cache_lock = threading.Lock()
+
+
+def parse_samplesheet_data(
+    samplesheet: str, open_file: Callable[[str], TextIO] = open
+) -> List[Dict[str, str]]:
+    # the parsed data is cached for as long as the samplesheet is unchanged on disk. The
+    # samplesheet is opened with open_file, e.g. to account for the data read from it
+    stat = os.stat(samplesheet)
+    key = (os.path.abspath(samplesheet), stat.st_mtime_ns, stat.st_size)
+    with _samplesheet_cache_lock:
+        data = _samplesheet_cache.get(key)
+        if data is not None:
+            _samplesheet_cache.move_to_end(key)
+    if data is None:
+        with open_file(samplesheet) as fh:
+            data = parse_samplesheet_data_from_stream(fh, samplesheet)
+        with _samplesheet_cache_lock:
+            _samplesheet_cache[key] = data
+            if len(_samplesheet_cache) > SAMPLESHEET_CACHE_SIZE:
+                _samplesheet_cache.popitem(last=False)
+    # return copies so that the cached data can not be modified by the caller
+    return [dict(row) for row in data]
+
+
+def parse_samplesheet_sections(fh: TextIO) -> Dict[str, List[str]]:
+    # split the samplesheet into its sections in one pass, indexed by the section name, e.g.
+    # "Header", "Data" or "BCLConvert_Data" for v2 samplesheets
+    sections = {}
+    lines = None
+    for line in fh:
+        if line.startswith("["):
+            name = line.strip().split(",")[0]
+            if name.endswith("]"):
+                lines = sections.setdefault(name[1:-1], [])
+                continue
+        if lines is not None:
+            lines.append(line)
+    return sections
+
+
+def parse_samplesheet_data_from_stream(fh: TextIO, samplesheet: str) -> List[Dict[str, str]]:
+    sections = parse_samplesheet_sections(fh)
+    try:
+        lines = next(
+            sections[name] for name in SAMPLESHEET_DATA_SECTIONS if name in sections
+        )
+    except StopIteration:
+        raise NoSampleSheetDataFoundException(samplesheet)
+
+    # the header is lowercased once and then zipped with each row, missing values are set to
+    # None and empty rows are skipped, as with a csv.DictReader
+    reader = csv.reader(lines, dialect="excel")
+    header = [key.lower() for key in next(reader, [])]
+    return [
+        dict(zip(header, row + [None] * (len(header) - len(row))))
+        for row in reader
+        if row
+    ]
+
+
+def parse_run_parameters(fh: BinaryIO) -> Dict[str, str]:
+    # parse the instrument type, flowcell mode, read structure and run start date from a
+    # RunParameters.xml file as a stream, parsing stops as soon as all of them have been found
+    # so the remainder of a large file is never read. The read structure is expressed as the
+    # number of cycles of the reads in sequencing order, e.g. "151-10-10-151"
+    # the number of cycles of each read are either given as separate elements, as for NovaSeq,
+    # or as attributes on one element per read. Not all of the separate elements are present
+    # for e.g. single index runs, so the read structure is built from the elements present when
+    # their parent element closes, or as soon as all of them have been found
+    read_elements = [
+        "Read1NumberOfCycles",
+        "IndexRead1NumberOfCycles",
+        "IndexRead2NumberOfCycles",
+        "Read2NumberOfCycles",
+    ]
+    read_containers = ["Reads", "PlannedReads"]
+    run_parameters = {}
+    reads = {}
+    # the depth of the element being parsed and of the separate read elements
+    depth = 0
+    read_elements_depth = None
+    for event, elem in ElementTree.iterparse(fh, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        tag = elem.tag.split("}")[-1]
+        text = (elem.text or "").strip()
+        if tag == "InstrumentType" and text:
+            run_parameters.setdefault("instrument_type", text)
+        elif tag == "FlowCellMode" and text:
+            run_parameters.setdefault("flowcell_mode", text)
+        elif tag == "RunStartDate" and text:
+            run_parameters.setdefault("run_start_date", text)
+        elif tag in read_elements and "read_structure" not in run_parameters:
+            reads[tag] = text
+            read_elements_depth = depth
+            if len(reads) == len(read_elements):
+                run_parameters["read_structure"] = "-".join(
+                    reads[r] for r in read_elements if reads[r] not in ["", "0"]
+                )
+        elif depth + 1 == read_elements_depth and "read_structure" not in run_parameters:
+            # the parent of the separate read elements
+            run_parameters["read_structure"] = "-".join(
+                reads[r] for r in read_elements if reads.get(r) not in [None, "", "0"]
+            )
+        elif tag in ["Read", "RunInfoRead"] and "read_structure" not in run_parameters:
+            cycles = elem.get("Cycles") or elem.get("NumCycles")
+            if cycles:
+                reads[len(reads)] = cycles
+        elif tag in read_containers and reads and "read_structure" not in run_parameters:
+            run_parameters["read_structure"] = "-".join(reads.values())
+        if len(run_parameters) == 4:
+            break
+        elem.clear()
+    return run_parameters
+
+
+def parse_run_date(datestr: str) -> Optional[datetime.datetime]:
+    # run dates are given as e.g. "210415", "20210415" or "2021-04-15T10:11:12Z"
+    for date_format in ["%y%m%d", "%Y%m%d"]:
         try:
-            # discard all rows until we encounter "[Data]"
-            while not row.startswith("[Data]"):
-                row = next(fh)
-        except StopIteration:
-            raise NoSampleSheetDataFoundException(samplesheet)
+            return datetime.datetime.strptime(datestr, date_format)
+        except ValueError:
+            pass
+    try:
+        return datetime.datetime.fromisoformat(datestr.replace("Z", "+00:00")).replace(
+            hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+        )
+    except ValueError:
+        pass
+
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(
+    fh: TextIO, keys: List[str], chunk_size: int = JSON_CHUNK_SIZE
+) -> Iterator:
+    """
+    Incrementally parse the items of an array nested in a JSON document, without loading the
+    whole document into memory. Only the items, one at a time, and any values preceding the
+    array are decoded. Parsing stops at the end of the array.
+
+    :param fh: a text file handle to the JSON document
+    :param keys: the keys leading to the array, e.g. ["result", "samples"] for
+    {"result": {"samples": [...]}}
+    :param chunk_size: the number of characters to read at a time
+    :return: an iterator over the decoded array items
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def _fill() -> bool:
+        # read more data into the buffer, discarding what has already been consumed
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        data = fh.read(chunk_size)
+        eof = not data
+        buf = buf[pos:] + data
+        pos = 0
+        return not eof
+
+    def _skip_whitespace() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not _fill():
+                raise ValueError("unexpected end of JSON document")
+
+    def _expect(chars: str) -> str:
+        nonlocal pos
+        char = _skip_whitespace()
+        if char not in chars:
+            raise ValueError(f"expected one of '{chars}' but got '{char}' in JSON document")
+        pos += 1
+        return char
+
+    def _decode():
+        # decode the next value, reading more data until it is complete. A value that is not
+        # followed by a delimiter may be truncated, e.g. a number, unless the document has ended
+        nonlocal pos
+        _skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if eof or (end < len(buf) and buf[end] in " \t\r\n,:]}"):
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            _fill()
+
+    def _descend(remaining_keys: List[str]) -> Iterator:
+        _expect("{")
+        if _skip_whitespace() == "}":
+            return
+        while True:
+            key = _decode()
+            _expect(":")
+            if key != remaining_keys[0]:
+                _decode()
+            elif len(remaining_keys) > 1:
+                yield from _descend(remaining_keys[1:])
+                return
+            else:
+                _expect("[")
+                if _skip_whitespace() == "]":
+                    return
+                while True:
+                    yield _decode()
+                    if _expect(",]") == "]":
+                        return
+            if _expect(",}") == "}":
+                return
+
+    yield from _descend(keys)
+
+
+# a number as it would be written in json, e.g. not with leading zeros
+CSV_NUMBER_PATTERN = re.compile(r"-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?")
+
 
-        # use a DictReader to parse the data
-        reader = csv.DictReader(fh, dialect="excel")
-        return [{key.lower(): value for key, value in row.items()} for row in reader]
+def parse_csv_value(value: str) -> object:
+    # parse numbers and booleans into the types they would have had in a json export, all other
+    # values are kept as strings
+    if value in ("true", "false"):
+        return value == "true"
+    if CSV_NUMBER_PATTERN.fullmatch(value):
+        return json.loads(value)
+    return value
 
 
-def find_samplesheet(search_path: str, suffix: str = "samplesheet.csv") -> List[str]:
-    csvfiles = find_file(search_path, suffix)
+def iter_csv_records(fh: TextIO) -> Iterator[Dict[str, object]]:
+    # parse records from a csv with one "key,value" row per field, e.g. a LIMS sample export.
+    # Blank rows are skipped and rows with more than one value are parsed as lists. A record
+    # ends where a key is repeated, so that several records can be concatenated in one stream
+    record = {}
+    for row in csv.reader(fh, dialect=csv.excel):
+        if len(row) < 2:
+            continue
+        if row[0] in record:
+            yield record
+            record = {}
+        values = [parse_csv_value(value) for value in row[1:]]
+        record[row[0]] = values[0] if len(values) == 1 else values
+    if record:
+        yield record
+
+
+def find_samplesheet(
+    search_path: str,
+    suffix: str = "samplesheet.csv",
+    listdir: Optional[Callable[[str], List[str]]] = None,
+) -> List[str]:
+    csvfiles = find_file(search_path, suffix, listdir=listdir)
     if not csvfiles:
         raise SampleSheetNotFoundException(search_path)
     return csvfiles
 
 
 def find_run_parameters(
-    search_path: str, suffix: str = "runparameters.xml"
+    search_path: str,
+    suffix: str = "runparameters.xml",
+    listdir: Optional[Callable[[str], List[str]]] = None,
 ) -> List[str]:
-    csvfiles = find_file(search_path, suffix)
+    csvfiles = find_file(search_path, suffix, listdir=listdir)
     if not csvfiles:
         raise RunParametersNotFoundException(search_path)
     return csvfiles
 
 
-def find_file(search_path: str, suffix: str) -> List[str]:
+def find_file(
+    search_path: str,
+    suffix: str,
+    listdir: Optional[Callable[[str], List[str]]] = None,
+) -> List[str]:
     csvfiles = list(
         filter(
             lambda f: f.lower().endswith(suffix),
-            os.listdir(search_path),
+            (listdir or os.listdir)(search_path),
         )
     )
     return csvfiles
 
 
+def find_runfolders(root_or_listfile: str, pattern: str) -> List[str]:
+    # a file is expected to list one runfolder path per line, a directory is searched for
+    # subdirectories and tar archives having names that look like runfolders
+    # imported here since runfolder_source imports this module
+    from snpseq_metadata.runfolder_source import TarRunfolderSource
+
+    if os.path.isfile(root_or_listfile):
+        with open(root_or_listfile) as fh:
+            return [
+                row.strip()
+                for row in fh
+                if row.strip() and not row.startswith("#")
+            ]
+    runfolders = []
+    for d in os.listdir(root_or_listfile):
+        path = os.path.join(root_or_listfile, d)
+        if os.path.isdir(path):
+            runfolder_name = d
+        elif TarRunfolderSource.is_tar_archive(path) and os.path.isfile(path):
+            runfolder_name = TarRunfolderSource.runfolder_name_from_tar_path(path)
+        else:
+            continue
+        if re.match(pattern, runfolder_name):
+            runfolders.append(path)
+    return sorted(runfolders)
+
+
+def iter_chunks(iterable: Iterable, chunk_size: int) -> Iterator[List]:
+    # split an iterable into lists of at most chunk_size items, consuming it lazily
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, chunk_size))
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    # a shard is specified as "i/n", where 1 <= i <= n
+    try:
+        shard_index, shard_count = map(int, shard.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"'{shard}' is not a valid shard, expected e.g. '1/4'")
+    if not 1 <= shard_index <= shard_count:
+        raise ValueError(f"'{shard}' is not a valid shard, expected 1 <= i <= n for 'i/n'")
+    return shard_index, shard_count
+
+
+def shard_for_key(key: str, shard_count: int) -> int:
+    # use a hash that is stable between processes, rather than the builtin hash()
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return int(digest, 16) % shard_count + 1
+
+
+class FilesystemStatistics:
+    """
+    Counts the number of and the time spent in file system operations, e.g. "listdir",
+    "isdir", "exists", "open" and "checksum", as well as the number of bytes read from files
+    opened through measure_file.
+
+    The statistics can be updated from several threads.
+    """
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.bytes_read = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        # the lock can not be pickled
+        state = dict(vars(self))
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, operation: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.counts[operation] = self.counts.get(operation, 0) + 1
+                self.seconds[operation] = self.seconds.get(operation, 0.0) + elapsed
+
+    def add_bytes_read(self, nbytes: int) -> None:
+        with self._lock:
+            self.bytes_read += nbytes
+
+    def measure_file(
+        self, fh: BinaryIO, text: bool = False, encoding: Optional[str] = None
+    ) -> IO:
+        # the bytes are counted on the binary file handle, also when it is read as text
+        counting_fh = _CountingFile(fh, self)
+        return io.TextIOWrapper(counting_fh, encoding=encoding) if text else counting_fh
+
+    def to_json(self) -> Dict:
+        return {
+            "operations": {
+                operation: {
+                    "count": self.counts[operation],
+                    "seconds": self.seconds[operation],
+                }
+                for operation in sorted(self.counts)
+            },
+            "bytes_read": self.bytes_read,
+        }
+
+    def report(self) -> str:
+        rows = [f"{'operation':<12}{'count':>10}{'seconds':>12}"]
+        for operation in sorted(self.counts):
+            rows.append(
+                f"{operation:<12}{self.counts[operation]:>10}{self.seconds[operation]:>12.3f}"
+            )
+        rows.append(f"{'bytes read':<12}{self.bytes_read:>10}")
+        return "\n".join(rows)
+
+
+class _CountingFile:
+    # wraps a file handle and counts the data read from it
+
+    def __init__(self, fh: IO, statistics: FilesystemStatistics) -> None:
+        self._fh = fh
+        self._statistics = statistics
+
+    def __getattr__(self, name):
+        return getattr(self._fh, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._fh.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = next(self._fh)
+        self._statistics.add_bytes_read(len(data))
+        return data
+
+    def read(self, *args):
+        data = self._fh.read(*args)
+        self._statistics.add_bytes_read(len(data))
+        return data
+
+    def read1(self, *args):
+        # used by io.TextIOWrapper, when reading the file as text
+        data = self._fh.read1(*args)
+        self._statistics.add_bytes_read(len(data))
+        return data
+
+    def readline(self, *args):
+        data = self._fh.readline(*args)
+        self._statistics.add_bytes_read(len(data))
+        return data
+
+
+def intern_value(value: object) -> object:
+    # intern strings, so that values repeated in many models, e.g. project ids and library kits,
+    # are kept in memory once. Other values are returned as they are
+    return sys.intern(value) if type(value) is str else value
+
+
 def log_exception(f):
 
     @wraps(f)
@@ -114,6 +114,19 @@ def run_data_csv(sample_data_path):
     )
 
 
+@pytest.fixture
+def lims_csv_files(sample_data_path):
+    # the csv exports of the samples in the experiment set, as listed in the run data
+    with open(os.path.join(sample_data_path, "run_data_XYZ321XY.csv")) as fh:
+        sample_csv_files = next(
+            row[1:] for row in csv.reader(fh) if row and row[0] == "sample_csv_files"
+        )
+    return [
+        os.path.join(os.path.dirname(sample_data_path), sample_csv_file)
+        for sample_csv_file in sample_csv_files
+    ]
+
+
 @pytest.fixture
 def experiment_set_lims_json_file(test_resources_path):
     return os.path.join(test_resources_path, "snpseq_data_XYZ321XY.json")
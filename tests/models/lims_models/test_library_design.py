@@ -6,9 +6,49 @@ from snpseq_metadata.models.lims_models.library_design import (
     LIMSSampleTypeClasses,
     LIMSLibraryKit,
     LIMSLibraryKitClasses,
+    LIMSLibraryKitRML,
+    LIMSLibraryObject,
 )
 
 
+def _recursive_match(cls, udf):
+    # the matching by recursing through the class hierarchy, which the term index replaces
+    if cls is LIMSLibraryKitRML:
+        return _recursive_match(LIMSLibraryKit, udf)
+    matches = [
+        m for m in map(lambda c: _recursive_match(c, udf), cls.__subclasses__()) if m is not None
+    ]
+    if not udf:
+        return None
+    if matches:
+        return matches[0]
+    if cls.match_terms(udf) or not cls.udf_terms:
+        return cls(udf)
+    return None
+
+
+class TestLIMSLibraryObject:
+
+    def test_match_as_recursive_match(self):
+        udfs = ["", None, "this-is-not-a-term", "RML- this-is-not-a-term"]
+        udfs.extend(
+            prefix + term
+            for cls in LIMSLibraryObject.match_order()
+            for term in getattr(cls, "udf_terms", [])
+            for prefix in ["", "RML- "]
+        )
+        for cls in [
+            LIMSLibraryObject,
+            LIMSApplication,
+            LIMSSampleType,
+            LIMSLibraryKit,
+            LIMSLibraryKitRML
+        ]:
+            for udf in udfs:
+                assert cls.match(udf) == _recursive_match(cls, udf), \
+                    f"'{udf}' was matched differently by {cls.__name__}"
+
+
 class TestLIMSLibraryKit:
 
     mappings = {
@@ -1,4 +1,8 @@
-from snpseq_metadata.models.lims_models import LIMSSample
+import json
+import pickle
+import pytest
+
+from snpseq_metadata.models.lims_models import LIMSSample, LIMSLibraryKit
 
 
 class TestLIMSSample:
@@ -21,3 +25,88 @@ class TestLIMSSample:
         for read_length, is_paired in expected_results.items():
             setattr(lims_sample_obj, "udf_read_length", read_length)
             assert lims_sample_obj.is_paired() == is_paired
+
+    def test_pickle(self, lims_sample_obj):
+        assert pickle.loads(pickle.dumps(lims_sample_obj)) == lims_sample_obj
+
+    def test_udf_aliases(self):
+        sample = LIMSSample(
+            sample_name="this-is-a-name",
+            sample_id="this-is-an-id",
+            project_id="this-is-a-project",
+            udf_id="2-1234",
+            udf_rml_kitprotocol="this-is-a-kit",
+        )
+        assert sample.udf_library_preparation_kit == sample.udf_rml_kitprotocol
+        assert sample.udf_sample_library_id == "this-is-an-id_2-1234"
+        # aliases referring to each other resolve to None when both are missing
+        assert sample.udf_insert_size_bp is None
+        assert sample.udf_length_current_bp is None
+        sample.udf_length_current_bp = 350
+        assert sample.udf_insert_size_bp == 350
+        with pytest.raises(AttributeError):
+            sample.udf_this_is_missing
+
+    def test_library_objects(self, lims_sample_json):
+        sample = LIMSSample.from_json(json_obj=lims_sample_json)
+        assert isinstance(sample.udf_library_preparation_kit, LIMSLibraryKit)
+
+    def test_has_udf(self):
+        sample = LIMSSample(
+            sample_name="this-is-a-name",
+            sample_id="this-is-an-id",
+            project_id="this-is-a-project",
+            udf_rml_kitprotocol="this-is-a-kit",
+        )
+        assert sample.has_udf("sample_name")
+        assert sample.has_udf("udf_library_preparation_kit")
+        assert sample.has_udf("udf_insert_size_bp")
+        assert not sample.has_udf("udf_id")
+        # the sample library id is derived from the udf_id
+        assert not sample.has_udf("udf_sample_library_id")
+        sample.udf_id = "2-1234"
+        assert sample.has_udf("udf_sample_library_id")
+        for name in ["udf_id", "udf_sample_library_id", "udf_this_is_missing"]:
+            assert sample.has_udf(name) == hasattr(sample, name)
+
+    def test_from_json_interned(self, lims_sample_json):
+        first, second = [
+            LIMSSample.from_json(json_obj=json.loads(json.dumps(lims_sample_json)))
+            for _ in range(2)
+        ]
+        for name, value in vars(first).items():
+            if isinstance(value, str):
+                assert value is vars(second)[name], name
+        assert first.udf_library_preparation_kit is second.udf_library_preparation_kit
+
+    def test_from_csv_record(self):
+        record = {
+            "sample_name": "this-is-a-name",
+            "sample_id": "this-is-an-id",
+            "project_id": "this-is-a-project",
+            "udf_id": "2-1234",
+            "experiment_library_kit": "this-is-a-kit",
+            "this_is_a_column": "this-is-a-value",
+        }
+        sample = LIMSSample.from_csv_record(record=record)
+        assert sample.sample_name == "this-is-a-name"
+        assert isinstance(sample.udf_library_preparation_kit, LIMSLibraryKit)
+        # columns without a field of their own are kept, missing fields are left out
+        assert sample.this_is_a_column == "this-is-a-value"
+        assert not sample.has_udf("udf_species")
+        assert "experiment_library_kit" not in sample.to_json()
+        # a missing library name is derived
+        assert sample.udf_sample_library_name == "this-is-an-id_2-1234"
+
+    def test_from_csv_record_rml(self):
+        # the library kit of a RML sample is read from the protocol, if the kit column is missing
+        sample = LIMSSample.from_csv_record(
+            record={
+                "sample_name": "this-is-a-name",
+                "sample_id": "this-is-an-id",
+                "project_id": "this-is-a-project",
+                "udf_rml_kitprotocol": "this-is-a-kit",
+            }
+        )
+        assert isinstance(sample.udf_library_preparation_kit, LIMSLibraryKit)
+        assert sample.udf_library_preparation_kit is sample.udf_rml_kitprotocol
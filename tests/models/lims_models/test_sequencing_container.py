@@ -1,3 +1,6 @@
+import io
+import json
+
 from snpseq_metadata.models.lims_models import LIMSSequencingContainer
 
 
@@ -14,3 +17,45 @@ class TestLIMSSequencingContainer:
         self, lims_sequencing_container_json, lims_sequencing_container_obj
     ):
         assert lims_sequencing_container_obj.to_json() == lims_sequencing_container_json
+
+    def test_iter_samples(
+        self, lims_sequencing_container_json, lims_sequencing_container_obj
+    ):
+        fh = io.StringIO(json.dumps(lims_sequencing_container_json, indent=2))
+        assert list(LIMSSequencingContainer.iter_samples(fh)) == \
+            lims_sequencing_container_obj.samples
+
+    def test_from_csv(self, lims_csv_files, experiment_set_lims_json):
+        fhs = [open(lims_csv_file) for lims_csv_file in lims_csv_files]
+        try:
+            sequencing_container = LIMSSequencingContainer.from_csv(fhs)
+        finally:
+            for fh in fhs:
+                fh.close()
+        expected_container = LIMSSequencingContainer.from_json(
+            json_obj=experiment_set_lims_json
+        )
+        assert sequencing_container.name == expected_container.name
+        assert len(sequencing_container.samples) == len(expected_container.samples)
+        for sample, expected_sample in zip(
+                sequencing_container.samples, expected_container.samples
+        ):
+            # the columns without a field of their own are kept in addition to the fields, and
+            # the fields missing from the csv export are empty in the json export
+            sample_json = sample.to_json()
+            expected_json = expected_sample.to_json()
+            assert {
+                k: "" if sample_json.get(k) is None else sample_json[k] for k in expected_json
+            } == expected_json
+        assert sequencing_container.samples[-1].flowcell_id == expected_container.name
+
+    def test_from_csv_column_mapping(self):
+        fh = io.StringIO("flowcell_id,ABC123XY\nname,this-is-a-name\nudf_id,2-1234\n")
+        sequencing_container = LIMSSequencingContainer.from_csv(
+            [fh], column_mapping={"name": "name"}
+        )
+        assert sequencing_container.name == "ABC123XY"
+        sample = sequencing_container.samples[0]
+        assert sample.sample_name == "this-is-a-name"
+        assert sample.udf_id == "2-1234"
+        assert not sample.has_udf("udf_species")
@@ -1,3 +1,10 @@
+import copy
+import gc
+import io
+import json
+import logging
+import weakref
+
 from snpseq_metadata.models.ngi_models import (
     NGIExperimentRef,
     NGIExperiment,
@@ -80,3 +87,56 @@ class TestNGIExperimentSet:
             experiment_ref=ngi_experiment_ref_obj
         )
         assert experiment == ngi_experiment_obj
+
+    def test_merge(self, ngi_experiment_set_obj, caplog):
+        experiments = ngi_experiment_set_obj.experiments
+        first = NGIExperimentSet(experiments=experiments[:-1])
+        second = NGIExperimentSet(experiments=list(reversed(experiments)))
+        with caplog.at_level(logging.WARNING):
+            assert NGIExperimentSet.merge([first, second]) == ngi_experiment_set_obj
+        assert not caplog.records
+
+        # an experiment with the same alias but different metadata is skipped with a warning
+        changed = copy.deepcopy(experiments[0])
+        changed.title = "this-is-a-different-title"
+        merged = NGIExperimentSet.merge(
+            [ngi_experiment_set_obj, NGIExperimentSet(experiments=[changed])]
+        )
+        assert merged == ngi_experiment_set_obj
+        assert changed.alias in caplog.text
+
+    def test_unique_experiments_streamed(self, ngi_experiment_set_obj):
+        # the experiments already yielded are not kept by the de-duplication
+        experiments = []
+        for i in range(3):
+            experiment = copy.deepcopy(ngi_experiment_set_obj.experiments[0])
+            experiment.alias = f"{experiment.alias}-{i}"
+            experiments.append(experiment)
+        references = []
+
+        def _copies():
+            for experiment in experiments + experiments:
+                experiment_copy = copy.deepcopy(experiment)
+                references.append(weakref.ref(experiment_copy))
+                yield experiment_copy
+
+        unique_experiments = NGIExperimentSet.unique_experiments(_copies())
+        aliases = [next(unique_experiments).alias for _ in experiments]
+        assert aliases == [experiment.alias for experiment in experiments]
+        # while the de-duplication is in progress, only the last experiment is referenced
+        gc.collect()
+        assert [reference() is None for reference in references] == \
+            [True] * (len(experiments) - 1) + [False]
+        assert next(unique_experiments, None) is None
+
+    def test_dump_json(self, ngi_experiment_set_obj):
+        experiments = ngi_experiment_set_obj.experiments
+        for experiment_set, expected_json in [
+            (ngi_experiment_set_obj, ngi_experiment_set_obj.to_json()),
+            (NGIExperimentSet(experiments=iter(experiments)), ngi_experiment_set_obj.to_json()),
+            (NGIExperimentSet(experiments=[]), {"experiments": []}),
+            (NGIExperimentSet(experiments=None), {}),
+        ]:
+            fh = io.StringIO()
+            experiment_set.dump_json(fh, indent=2)
+            assert fh.getvalue() == json.dumps(expected_json, indent=2)
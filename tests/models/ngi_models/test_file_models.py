@@ -1,6 +1,13 @@
 import os
 
-from snpseq_metadata.models.ngi_models import NGIResultFile, NGIFastqFile
+import pickle
+
+from snpseq_metadata.models.ngi_models import (
+    NGIResultFile,
+    NGIFastqFile,
+    NGIFastqFileTable,
+    NGIFastqFileView,
+)
 
 
 class TestNGIResultFile:
@@ -40,3 +47,57 @@ class TestNGIFastqFile:
 
     def test_to_json(self, ngi_fastq_file_obj, ngi_fastq_file_json):
         assert ngi_fastq_file_obj.to_json() == ngi_fastq_file_json
+
+
+class TestNGIFastqFileTable:
+    def test_append(self):
+        table = NGIFastqFileTable(checksum_method="MD5")
+        dirpath = os.path.join("runfolder", "Unaligned", "AB-1234", "Sample_AB-1234-1")
+        rows = [
+            table.append(
+                dirpath=dirpath,
+                filename="AB-1234-1_S1_L002_R2_001.fastq.gz",
+                checksum="0123456789abcdef0123456789abcdef",
+                size=1024,
+            ),
+            table.append(
+                dirpath=dirpath,
+                filename="AB-1234-1_S1_L001_I1_001.fastq.gz",
+                checksum="this-is-not-a-digest",
+            ),
+            table.append(
+                dirpath=dirpath,
+                filename="this-is-not-a-bcl2fastq-name.fastq",
+                checksum=None,
+            ),
+        ]
+        assert len(table) == 3
+        assert [table.lane(i) for i in rows] == [2, 1, None]
+        assert [table.read(i) for i in rows] == ["R2", "I1", None]
+        assert [table.size(i) for i in rows] == [1024, None, None]
+        assert [table.checksum(i) for i in rows] == [
+            "0123456789abcdef0123456789abcdef",
+            "this-is-not-a-digest",
+            None,
+        ]
+        assert table[rows[0]] == NGIFastqFile(
+            filepath=os.path.join(dirpath, "AB-1234-1_S1_L002_R2_001.fastq.gz"),
+            checksum="0123456789abcdef0123456789abcdef",
+            checksum_method="MD5",
+        )
+        # the directory is only stored once
+        assert len(table._dirs) == 1
+
+    def test_view(self):
+        table = NGIFastqFileTable()
+        for i in range(5):
+            table.append(dirpath="dir", filename=f"file{i}.fastq", checksum=f"{i:032x}")
+        view = table.view([3, 1])
+        assert isinstance(view, NGIFastqFileView)
+        assert len(view) == 2
+        assert view == [table[3], table[1]]
+        assert [table[3], table[1]] == view
+        assert view != [table[1], table[3]]
+        assert view[1:] == [table[1]]
+        assert pickle.loads(pickle.dumps(view)) == view
+        assert [f.to_json() for f in view] == [table[3].to_json(), table[1].to_json()]
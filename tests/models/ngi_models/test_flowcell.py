@@ -1,9 +1,14 @@
+import datetime
+import io
 import os
 import pytest
 import uuid
 
 import snpseq_metadata.utilities
-from snpseq_metadata.exceptions import FastqFileLocationNotFoundException
+from snpseq_metadata.exceptions import (
+    FastqFileLocationNotFoundException,
+    ShardMergeException,
+)
 from snpseq_metadata.models.ngi_models import (
     NGIAttribute,
     NGIFlowcell,
@@ -69,6 +74,40 @@ class TestNGIFlowcell:
         assert isinstance(platform, NGIIlluminaSequencingPlatform)
         assert platform.model_name == model_name
 
+    def test_get_run_parameters_data(self, ngi_flowcell_obj, monkeypatch):
+        # an empty or missing run parameters file falls back to the runfolder name
+        assert ngi_flowcell_obj.get_run_parameters_data() == {}
+
+        def _run_parameters_data(*args, **kwargs):
+            return {
+                "instrument_type": "MiSeq",
+                "run_start_date": "20220101",
+                "flowcell_mode": "this-is-a-flowcell-mode",
+                "read_structure": "151-151",
+            }
+
+        monkeypatch.setattr(
+            snpseq_metadata.utilities, "parse_run_parameters", _run_parameters_data
+        )
+        monkeypatch.setattr(ngi_flowcell_obj._source, "open", lambda *args, **kwargs: io.BytesIO())
+        flowcell = NGIFlowcell(
+            runfolder_path=ngi_flowcell_obj.runfolder_path,
+            samplesheet=ngi_flowcell_obj.samplesheet,
+            run_parameters=ngi_flowcell_obj.run_parameters,
+            sequencing_runs=ngi_flowcell_obj.sequencing_runs,
+            source=ngi_flowcell_obj._source,
+        )
+        assert flowcell.platform.model_name == "MiSeq"
+        assert flowcell.run_date == datetime.datetime(2022, 1, 1)
+        assert flowcell.flowcell_mode == "this-is-a-flowcell-mode"
+        assert flowcell.read_structure == "151-151"
+
+        # assert that the parsed values are serialized and not parsed again from json
+        monkeypatch.setattr(
+            snpseq_metadata.utilities, "parse_run_parameters", lambda *args: {}
+        )
+        assert NGIFlowcell.from_json(json_obj=flowcell.to_json()) == flowcell
+
     def test_get_checksumfile(self, ngi_flowcell_obj, monkeypatch):
         assert ngi_flowcell_obj.get_checksumfile() is None
         monkeypatch.setattr(os.path, "exists", lambda x: True)
@@ -174,15 +213,15 @@ class TestNGIFlowcell:
         def _fastqdir(*args, **kwargs):
             return os.path.join(tmpdir, "fastq")
 
-        def _checksum(queryfile, method):
-            return f"{method}-{os.path.basename(queryfile)}"
+        def _checksum(fh, method):
+            return f"{method}-{os.path.basename(fh.name)}"
 
         # set up the test
         monkeypatch.setattr(
             ngi_flowcell_obj, "get_fastqdir_for_experiment_ref", _fastqdir
         )
         monkeypatch.setattr(
-            snpseq_metadata.utilities, "calculate_checksum_from_file", _checksum
+            snpseq_metadata.utilities, "calculate_checksum_from_stream", _checksum
         )
         ngi_flowcell_obj.runfolder_path = tmpdir
 
@@ -276,3 +315,75 @@ class TestNGIFlowcell:
         )
         ngi_flowcell_obj.sample_id = sample_id
         assert ngi_flowcell_obj.get_experiments() == exp_experiments
+
+    def test_get_experiments_multiple_samplesheets(
+        self,
+        ngi_flowcell_obj,
+        samplesheet_rows,
+        samplesheet_experiment_refs,
+        monkeypatch,
+    ):
+        samplesheets = ["SampleSheet_L1.csv", "SampleSheet_L2.csv"]
+
+        def _samplesheet_rows(samplesheet, *args, **kwargs):
+            # the first row is present in both samplesheets
+            if os.path.basename(samplesheet) == samplesheets[0]:
+                return samplesheet_rows[0:1]
+            return samplesheet_rows
+
+        monkeypatch.setattr(
+            snpseq_metadata.utilities, "parse_samplesheet_data", _samplesheet_rows
+        )
+        ngi_flowcell_obj.samplesheets = samplesheets
+        experiments = ngi_flowcell_obj.get_experiments()
+        assert len(experiments) == len(samplesheet_experiment_refs)
+        for experiment, expected_experiment in zip(experiments, samplesheet_experiment_refs):
+            assert experiment.alias == expected_experiment.alias
+        assert [e.samplesheet for e in experiments] == \
+            [samplesheets[0]] + [samplesheets[1]] * (len(experiments) - 1)
+
+        # assert that the samplesheets are serialized and parsed
+        ngi_flowcell_obj.sequencing_runs[0].experiment = experiments[0]
+        parsed_obj = NGIFlowcell.from_json(json_obj=ngi_flowcell_obj.to_json())
+        assert parsed_obj.samplesheets == samplesheets
+        assert parsed_obj.sequencing_runs[0].experiment.samplesheet == samplesheets[0]
+
+    def test_merge(self, ngi_flowcell_obj, ngi_sequencing_run_obj):
+        ngi_flowcell_obj.experiment_aliases = [ngi_sequencing_run_obj.experiment.alias]
+        shards = []
+        for shard, sequencing_runs in [("1/2", ngi_flowcell_obj.sequencing_runs), ("2/2", [])]:
+            shard_json = ngi_flowcell_obj.to_json()
+            shard_json["shard"] = shard
+            shard_json["sequencing_runs"] = [run.to_json() for run in sequencing_runs]
+            shards.append(NGIFlowcell.from_json(json_obj=shard_json))
+        assert shards[1].sequencing_runs == []
+
+        merged = NGIFlowcell.merge(shards)
+        assert merged.shard is None
+        assert merged.experiment_aliases is None
+        assert merged.sequencing_runs == ngi_flowcell_obj.sequencing_runs
+
+        # assert that a missing shard is detected
+        with pytest.raises(ShardMergeException):
+            NGIFlowcell.merge(shards[0:1])
+
+        # assert that shards from different extractions are not merged
+        shards[1].experiment_aliases = []
+        with pytest.raises(ShardMergeException):
+            NGIFlowcell.merge(shards)
+
+        # assert that a flowcell that is not a shard is detected
+        with pytest.raises(ShardMergeException):
+            NGIFlowcell.merge([ngi_flowcell_obj] + shards)
+
+    def test_from_json_empty_shard(self, ngi_flowcell_obj, tmpdir):
+        # a shard without sequencing runs is loaded without access to the runfolder
+        shard_json = ngi_flowcell_obj.to_json()
+        shard_json["runfolder_path"] = os.path.join(
+            tmpdir, os.path.basename(ngi_flowcell_obj.runfolder_path)
+        )
+        shard_json["shard"] = "2/2"
+        shard_json["sequencing_runs"] = []
+        shard_obj = NGIFlowcell.from_json(json_obj=shard_json)
+        assert shard_obj.sequencing_runs == []
+        assert shard_obj.to_json() == shard_json
@@ -1,3 +1,5 @@
+import json
+
 from snpseq_metadata.models.ngi_models import NGILibrary, NGILibraryLayout
 
 
@@ -17,3 +19,13 @@ class TestNGILibrary:
 
     def test_to_json(self, ngi_library_obj, ngi_library_json):
         assert ngi_library_obj.to_json() == ngi_library_json
+
+    def test_from_json_shared(self, ngi_library_json):
+        first, second = [
+            NGILibrary.from_json(json_obj=json.loads(json.dumps(ngi_library_json)))
+            for _ in range(2)
+        ]
+        assert first.application is second.application
+        assert first.sample_type is second.sample_type
+        assert first.library_kit is second.library_kit
+        assert first.library_protocol is second.library_protocol
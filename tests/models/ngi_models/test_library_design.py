@@ -6,9 +6,40 @@ from snpseq_metadata.models.ngi_models.library_design import (
     NGISourceClasses,
     NGILibraryKit,
     NGILibraryKitClasses,
+    NGIObject,
 )
 
 
+def _recursive_match(cls, description):
+    # the matching by recursing through the class hierarchy, which the term index replaces
+    matches = [
+        m
+        for m in map(lambda c: _recursive_match(c, description), cls.__subclasses__())
+        if m is not None
+    ]
+    if matches:
+        return matches[0]
+    if cls.match_terms(description) or not cls.descriptions:
+        return cls(description)
+    return None
+
+
+class TestNGIObject:
+
+    def test_match_as_recursive_match(self):
+        descriptions = ["", None, "this-is-not-a-term", "RML- this-is-not-a-term"]
+        descriptions.extend(
+            prefix + term
+            for cls in NGIObject.match_order()
+            for term in getattr(cls, "descriptions", [])
+            for prefix in ["", "RML- "]
+        )
+        for cls in [NGIObject, NGIApplication, NGISource, NGILibraryKit]:
+            for description in descriptions:
+                assert cls.match(description) == _recursive_match(cls, description), \
+                    f"'{description}' was matched differently by {cls.__name__}"
+
+
 class TestNGILibraryKit:
 
     mappings = {
@@ -36,3 +36,22 @@ class TestNGIIlluminaSequencingPlatform:
             NGIIlluminaSequencingPlatform.model_name_from_id(
                 model_id="non-existing-model"
             )
+
+    def test_model_name_from_instrument_type(self):
+        for instrument_type, model_name in {
+            "NovaSeqXPlus": "NovaSeqX",
+            "NovaSeq X": "NovaSeqX",
+            "NovaSeq6000": "NovaSeq",
+            "MiSeq": "MiSeq",
+            "HiSeq X": "HiSeqX",
+            "HiSeq 2500": "HiSeq2500",
+            "HiSeq": "HiSeq",
+            "iSeq": "iSeq",
+        }.items():
+            assert NGIIlluminaSequencingPlatform.model_name_from_instrument_type(
+                instrument_type=instrument_type
+            ) == model_name
+        with pytest.raises(InstrumentModelNotRecognizedException):
+            NGIIlluminaSequencingPlatform.model_name_from_instrument_type(
+                instrument_type="non-existing-model"
+            )
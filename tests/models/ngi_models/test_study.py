@@ -1,3 +1,7 @@
+import gc
+import json
+
+from snpseq_metadata.models.metadata_model import MetadataModel
 from snpseq_metadata.models.ngi_models import NGIStudyRef
 
 
@@ -8,3 +12,18 @@ class TestNGIStudyRef:
 
     def test_to_json(self, ngi_study_obj, ngi_study_json):
         assert ngi_study_obj.to_json() == ngi_study_json
+
+    def test_from_json_shared(self, ngi_study_json):
+        # separately parsed json gives distinct but equal strings
+        first, second = [
+            NGIStudyRef.from_json(json_obj=json.loads(json.dumps(ngi_study_json)))
+            for _ in range(2)
+        ]
+        assert first is second
+        assert NGIStudyRef.shared("this-is-another-project") is not first
+
+        # shared instances are only kept as long as they are referenced
+        key = (NGIStudyRef, (str, first.project_id))
+        del first, second
+        gc.collect()
+        assert key not in MetadataModel._shared_instances
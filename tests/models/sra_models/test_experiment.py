@@ -1,3 +1,5 @@
+import pickle
+
 from snpseq_metadata.models.sra_models import (
     SRAExperiment,
     SRAExperimentRef,
@@ -104,3 +106,8 @@ class TestSRAExperimentSet:
             study_ref=sra_experiment_obj.study_ref
         )
         assert experiment_set.experiments == [sra_experiment_obj]
+
+    def test_pickle(self, sra_experiment_set_obj):
+        experiment_set = pickle.loads(pickle.dumps(sra_experiment_set_obj))
+        assert experiment_set == sra_experiment_set_obj
+        assert experiment_set.to_xml() == sra_experiment_set_obj.to_xml()
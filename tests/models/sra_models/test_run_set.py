@@ -1,3 +1,5 @@
+import pickle
+
 
 from snpseq_metadata.models.sra_models.run_set import SRARun, SRARunSet
 
@@ -96,3 +98,8 @@ class TestSRARunSet:
         assert (
                 sra_sequencing_run_set_obj.get_sequencing_run_for_experiment(
                     sra_experiment_obj) == run_obj)
+
+    def test_pickle(self, sra_sequencing_run_set_obj):
+        sequencing_run_set = pickle.loads(pickle.dumps(sra_sequencing_run_set_obj))
+        assert sequencing_run_set == sra_sequencing_run_set_obj
+        assert sequencing_run_set.to_xml() == sra_sequencing_run_set_obj.to_xml()
@@ -1,3 +1,5 @@
+import copy
+import os
 import pytest
 
 from snpseq_metadata.models.converter import *
@@ -14,6 +16,122 @@ class TestConverter:
         with pytest.raises(NGIModelConversionException):
             assert Converter.lims_to_ngi(lims_model=None)
 
+    # The exception should be built for the innermost conversion that failed, even though only
+    # the outermost conversion handles the error
+    def test_nested_exception(self, lims_sequencing_container_obj, caplog):
+        broken_sample = LIMSSample(
+            sample_name="this-is-a-name",
+            sample_id="this-is-an-id",
+            project_id="this-is-a-project"
+        )
+        with pytest.raises(NGIModelConversionException) as exc_info:
+            Converter.lims_to_ngi(lims_model=broken_sample)
+        assert str(exc_info.value).startswith(
+            "LIMSSample could not be converted to a suitable NGISampleDescriptor object"
+        )
+        assert isinstance(exc_info.value.__cause__, AttributeError)
+
+        # errors handled within a conversion are still raised as conversion exceptions
+        lims_sequencing_container_obj.samples.append(broken_sample)
+        pool = ConvertPool.lims_to_ngi(lims_model=lims_sequencing_container_obj)
+        assert len(pool.samples) == len(lims_sequencing_container_obj.samples) - 1
+        assert f"{broken_sample} skipped - LIMSSample could not be converted to a suitable " \
+               f"NGIPoolMember object" in caplog.text
+
+    # The converters for a model type should be the matching subclasses, in order of definition
+    def test_converters_for(self, ngi_sample_obj, lims_sample_obj):
+        for model_class_attribute, model in [
+            ("ngi_model_class", ngi_sample_obj),
+            ("lims_model_class", lims_sample_obj),
+        ]:
+            expected = [
+                subclass
+                for subclass in Converter.__subclasses__()
+                if isinstance(model, getattr(subclass, model_class_attribute))
+            ]
+            converters = Converter.converters_for(model_class_attribute, type(model))
+            assert converters == expected
+            assert Converter.converters_for(model_class_attribute, type(model)) is converters
+        assert Converter.converters_for("ngi_model_class", type(None)) == []
+
+
+class TestConverterStatistics:
+    def test_collect(self, ngi_experiment_set_obj):
+        with ConverterStatistics.collect() as statistics:
+            Converter.ngi_to_sra(ngi_model=ngi_experiment_set_obj)
+            with pytest.raises(SRAModelConversionException):
+                Converter.ngi_to_sra(ngi_model=None)
+        assert ConverterStatistics.active is None
+
+        experiments = len(ngi_experiment_set_obj.experiments)
+        assert statistics.counts[("ConvertExperimentSet", "ngi_to_sra")] == 1
+        assert statistics.counts[("ConvertExperiment", "ngi_to_sra")] == experiments
+        assert statistics.failures[("Converter", "ngi_to_sra")] == 1
+        assert statistics.failures[("ConvertExperiment", "ngi_to_sra")] == 0
+        for key in statistics.counts:
+            assert 0.0 <= statistics.self_seconds[key] <= statistics.seconds[key]
+        # the self time of the top-level conversion excludes the time of the nested conversions
+        key = ("ConvertExperimentSet", "ngi_to_sra")
+        assert statistics.self_seconds[key] < statistics.seconds[key]
+
+        assert len(statistics.to_json()) == len(statistics.counts)
+        assert len(statistics.report().splitlines()) == len(statistics.counts) + 1
+
+        # nothing is counted when the statistics are not collected
+        Converter.ngi_to_sra(ngi_model=ngi_experiment_set_obj)
+        assert statistics.counts[("ConvertExperimentSet", "ngi_to_sra")] == 1
+
+
+class TestSRAConversionCache:
+    def test_ngi_to_sra_many(self, ngi_experiment_set_obj, tmpdir):
+        experiments = ngi_experiment_set_obj.experiments
+        expected = Converter.ngi_to_sra_many(experiments)
+
+        cache = SRAConversionCache.load(str(tmpdir))
+        assert Converter.ngi_to_sra_many(experiments, cache=cache) == expected
+        assert (cache.hits, cache.misses) == (0, len(experiments))
+        cache.save(str(tmpdir))
+
+        # only the changed experiment is converted again
+        experiments[0].title = "this-is-a-new-title"
+        cache = SRAConversionCache.load(str(tmpdir))
+        sra_experiments = Converter.ngi_to_sra_many(experiments, cache=cache)
+        assert sra_experiments == Converter.ngi_to_sra_many(experiments)
+        assert sra_experiments[0] != expected[0]
+        assert (cache.hits, cache.misses) == (len(experiments) - 1, 1)
+        # only the entries used are saved
+        assert len(cache.used) == len(experiments)
+
+    def test_load_unusable(self, ngi_experiment_set_obj, tmpdir, monkeypatch):
+        experiments = ngi_experiment_set_obj.experiments
+        cache = SRAConversionCache()
+        Converter.ngi_to_sra_many(experiments, cache=cache)
+        cache.save(str(tmpdir))
+        assert len(SRAConversionCache.load(str(tmpdir)).entries) == len(experiments)
+
+        # a cache saved by another version of the code is not reused, also when the version of
+        # the package is unknown or unchanged
+        code_version = SRAConversionCache.code_version()
+        for changed_version in [
+            {**code_version, "package_version": "0.0.0"},
+            {**code_version, "source_digest": "this-is-another-digest"},
+        ]:
+            monkeypatch.setattr(
+                SRAConversionCache, "code_version", staticmethod(lambda: changed_version)
+            )
+            assert not SRAConversionCache.load(str(tmpdir)).entries
+            monkeypatch.undo()
+        assert code_version["source_digest"]
+
+        # nor is a truncated or corrupt cache
+        cache_file = os.path.join(str(tmpdir), SRAConversionCache.file_name)
+        with open(cache_file, "rb") as fh:
+            cache_bytes = fh.read()
+        for corrupt_bytes in [cache_bytes[:len(cache_bytes) // 2], b"this-is-not-a-pickle"]:
+            with open(cache_file, "wb") as fh:
+                fh.write(corrupt_bytes)
+            assert not SRAConversionCache.load(str(tmpdir)).entries
+
 
 class TestConvertSampleDescriptor:
     def test_ngi_to_sra(self, ngi_sample_obj, sra_sample_obj):
@@ -188,6 +306,73 @@ class TestConvertExperimentSet:
         ):
             assert type(experiment) == type(ngi_experiment_obj)
 
+    def test_lims_to_ngi_processes(self, lims_sequencing_container_obj, caplog):
+        experiment_set = ConvertExperimentSet.lims_to_ngi(
+            lims_model=lims_sequencing_container_obj
+        )
+        broken_sample = LIMSSample(
+            sample_name="this-is-a-name",
+            sample_id="this-is-an-id",
+            project_id="this-is-a-project"
+        )
+        lims_samples = [broken_sample] + lims_sequencing_container_obj.samples
+        experiments = list(
+            ConvertExperiment.lims_to_ngi_many(lims_samples, processes=2, chunk_size=1)
+        )
+        assert experiments == experiment_set.experiments
+        assert f"{broken_sample} skipped" in caplog.text
+
+    def test_lims_to_sra(self, lims_sequencing_container_obj):
+        ngi_experiment_set = ConvertExperimentSet.lims_to_ngi(
+            lims_model=lims_sequencing_container_obj
+        )
+        assert ConvertExperimentSet.lims_to_sra(
+            lims_model=lims_sequencing_container_obj
+        ) == Converter.ngi_to_sra(ngi_model=ngi_experiment_set)
+
+    def test_ngi_to_sra_processes(self, ngi_experiment_set_obj):
+        experiment_set = Converter.ngi_to_sra(ngi_model=ngi_experiment_set_obj)
+        # the experiment set is too small to be converted by worker processes by default
+        experiments = Converter.ngi_to_sra_many(
+            ngi_experiment_set_obj.experiments,
+            processes=2,
+            chunk_size=1,
+            min_process_size=0
+        )
+        assert experiments == experiment_set.experiments
+        assert ConvertExperimentSet.ngi_to_sra(
+            ngi_model=ngi_experiment_set_obj, processes=2
+        ) == experiment_set
+        # the exception raised is the same as when converting in this process
+        broken_experiment = copy.deepcopy(ngi_experiment_set_obj.experiments[0])
+        broken_experiment.platform.model_name = "this-is-not-a-model"
+        for ngi_models in [[None], [broken_experiment]]:
+            with pytest.raises(SRAModelConversionException) as expected_ex:
+                Converter.ngi_to_sra_many(ngi_models)
+            with pytest.raises(SRAModelConversionException) as ex:
+                Converter.ngi_to_sra_many(
+                    ngi_experiment_set_obj.experiments + ngi_models,
+                    processes=2,
+                    chunk_size=1,
+                    min_process_size=0
+                )
+            assert str(ex.value) == str(expected_ex.value)
+        assert "reason: Instrument model 'this-is-not-a-model'" in str(ex.value)
+
+    def test_ngi_to_sra_many(self, ngi_experiment_set_obj):
+        experiments = ngi_experiment_set_obj.experiments
+        sra_experiments = Converter.ngi_to_sra_many(experiments)
+        assert sra_experiments == [Converter.ngi_to_sra(e) for e in experiments]
+        # the study references and platforms are converted once per value
+        for first, second in zip(sra_experiments, sra_experiments[1:]):
+            for attribute in ["study_ref", "platform"]:
+                first_object = getattr(first.model_object, attribute)
+                second_object = getattr(second.model_object, attribute)
+                assert (first_object is second_object) == (first_object == second_object)
+        # outside of a batch, nothing is shared
+        first, second = [Converter.ngi_to_sra(experiments[0]) for _ in range(2)]
+        assert first.model_object.study_ref is not second.model_object.study_ref
+
 
 class TestConvertLibrary:
     def test_ngi_to_sra(self, ngi_library_obj, sra_library_obj):
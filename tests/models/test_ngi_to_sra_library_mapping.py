@@ -28,3 +28,17 @@ class TestApplicationSampleTypeMapping:
                             ) is exp
                         ), f"Input {','.join([src.__name__, app.__name__, lib.__name__])} " \
                            f"did not get mapped to type {exp}"
+
+    def test_library_class_for(self):
+        # the cached lookup by types should give the first mapping matched by is_match
+        for inp, _ in self.mappings:
+            for src in inp[0]:
+                for app in inp[1]:
+                    for lib in inp[2]:
+                        query = (src("test-source"), app("test-application"), lib("test-kit"))
+                        expected = next(
+                            exp for mapping, exp in self.mappings
+                            if ModelMapper.is_match(query, mapping)
+                        )
+                        assert ModelMapper.library_class_for(src, app, lib) is expected
+                        assert type(ModelMapper.map_library(*query)) is expected
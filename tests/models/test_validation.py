@@ -0,0 +1,99 @@
+import json
+import logging
+
+from snpseq_metadata.models.converter import ConvertExperiment, ConvertExperimentSet
+from snpseq_metadata.models.lims_models import LIMSSample
+from snpseq_metadata.models.validation import LIMSValidationReport
+
+
+def _sample(**udf):
+    return LIMSSample(
+        sample_name="this-is-a-name",
+        sample_id="this-is-an-id",
+        project_id="this-is-a-project",
+        **udf
+    )
+
+
+class TestLIMSValidationReport:
+    def test_from_samples_as_conversion(self, lims_sequencing_container_obj):
+        # the samples that are valid should be exactly the samples that can be converted
+        samples = lims_sequencing_container_obj.samples + [
+            _sample(),
+            _sample(udf_id="2-1234"),
+            _sample(
+                udf_sample_library_id="this-is-a-library",
+                udf_sequencing_instrument="NovaSeq",
+                udf_application="WG re-seq",
+                udf_sample_type="gDNA",
+                udf_rml_kitprotocol="custom"
+            )
+        ]
+        report = LIMSValidationReport.from_samples(samples)
+        for sample in samples:
+            try:
+                converted = ConvertExperiment.lims_to_ngi(lims_model=sample) is not None
+            except Exception:
+                converted = False
+            assert report.is_valid(sample) == converted, str(sample)
+
+    def test_errors_and_warnings(self):
+        missing = _sample(udf_id="2-1234")
+        unknown = _sample(
+            udf_sample_library_id="this-is-a-library",
+            udf_sequencing_instrument="this-is-not-an-instrument",
+            udf_application="WG re-seq",
+            udf_sample_type="gDNA",
+            udf_library_preparation_kit="this-is-not-a-kit"
+        )
+        not_a_string = _sample(
+            udf_sample_library_id="this-is-another-library",
+            udf_sequencing_instrument=6000,
+            udf_application="WG re-seq",
+            udf_sample_type="gDNA",
+            udf_library_preparation_kit="TruSeq DNA PCR-free"
+        )
+        report = LIMSValidationReport.from_samples([missing, unknown, not_a_string])
+        assert report.invalid_count == 3
+        assert list(report.valid_samples([missing, unknown, not_a_string])) == []
+        # the sample library id is derived from the udf_id, so it is not missing
+        assert [
+            (issue["field"], issue["reason"]) for issue in report.errors if
+            issue["value"] is None
+        ] == [
+            ("udf_sequencing_instrument", "missing UDF"),
+            ("udf_application", "missing UDF"),
+            ("udf_sample_type", "missing UDF"),
+            ("udf_library_preparation_kit", "missing UDF"),
+        ]
+        assert [issue["value"] for issue in report.errors if issue["value"] is not None] == [
+            "this-is-not-an-instrument", 6000
+        ]
+        assert [(issue["field"], issue["value"]) for issue in report.warnings] == [
+            ("udf_library_preparation_kit", "this-is-not-a-kit")
+        ]
+        assert json.loads(json.dumps(report.to_json()))["invalid_samples"] == 3
+
+    def test_log(self, caplog):
+        report = LIMSValidationReport.from_samples([_sample(), _sample()])
+        with caplog.at_level(logging.WARNING):
+            report.log()
+        assert len(caplog.records) == 1
+        assert caplog.records[0].message.startswith("2 of 2 samples skipped")
+
+    def test_lims_to_ngi(self, lims_sequencing_container_obj, caplog):
+        experiment_set = ConvertExperimentSet.lims_to_ngi(
+            lims_model=lims_sequencing_container_obj
+        )
+        assert experiment_set.experiments == list(
+            ConvertExperiment.lims_to_ngi_many(lims_sequencing_container_obj.samples)
+        )
+        # the invalid samples are skipped without raising and logging an exception for each
+        report = LIMSValidationReport.from_samples(lims_sequencing_container_obj.samples)
+        caplog.clear()
+        with caplog.at_level(logging.DEBUG):
+            ConvertExperimentSet.lims_to_ngi(
+                lims_model=lims_sequencing_container_obj,
+                validation_report=report
+            )
+        assert not caplog.records
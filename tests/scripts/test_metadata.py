@@ -1,5 +1,8 @@
+import concurrent.futures
+import json
 import os
 import pathlib
+import tarfile
 import tempfile
 
 from click.testing import CliRunner
@@ -79,6 +82,136 @@ class TestExportMetadata:
             "json",
         )
 
+    def test_export_from_lims(
+        self,
+        runfolder_ngi_json_file,
+        experiment_set_ngi_json_file,
+        experiment_set_lims_json_file,
+    ):
+        # exporting directly from the LIMS export should give the same files as exporting
+        # from the NGI json extracted from it
+        outputs = []
+        for extra_args, experiment_set_file in [
+            ([], experiment_set_ngi_json_file),
+            (["--from-lims"], experiment_set_lims_json_file),
+        ]:
+            with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+                metadata_helper(
+                    metadata.metadata,
+                    [
+                        "export",
+                        "-o",
+                        outdir,
+                        *extra_args,
+                        runfolder_ngi_json_file,
+                        experiment_set_file,
+                        "xml",
+                        "json",
+                        "manifest",
+                        "tsv",
+                    ]
+                )
+                outputs.append({
+                    path.name: path.read_text()
+                    for path in pathlib.Path(outdir).iterdir()
+                })
+        assert outputs[0]
+        assert outputs[0] == outputs[1]
+
+    def test_export_previous(
+        self,
+        runfolder_ngi_json_file,
+        experiment_set_ngi_json,
+    ):
+        # exporting against a previous export should only convert the changed experiments, and
+        # give the same files as exporting without it
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as tmpdir:
+            experiment_set_files = []
+            for i in range(2):
+                experiment_set_file = os.path.join(tmpdir, f"experiment_set_{i}.json")
+                with open(experiment_set_file, "w") as fh:
+                    json.dump(experiment_set_ngi_json, fh)
+                experiment_set_files.append(experiment_set_file)
+                experiment_set_ngi_json["experiments"][0]["title"] = "this-is-a-new-title"
+
+            first_outdir = os.path.join(tmpdir, "first")
+            outputs = []
+            for name, experiment_set_file, options in [
+                ("first", experiment_set_files[0], ["--save-cache"]),
+                ("fresh", experiment_set_files[1], []),
+                ("incremental", experiment_set_files[1], ["--previous", first_outdir]),
+            ]:
+                outdir = os.path.join(tmpdir, name)
+                os.mkdir(outdir)
+                result = CliRunner().invoke(
+                    metadata.metadata,
+                    ["export", "-o", outdir] + options + [
+                        runfolder_ngi_json_file,
+                        experiment_set_file,
+                        "xml",
+                        "json",
+                    ]
+                )
+                assert result.exit_code == 0
+                outputs.append({
+                    path.name: path.read_text()
+                    for path in pathlib.Path(outdir).iterdir()
+                    if path.suffix != ".pickle"
+                })
+        assert "converted 1 runs and experiments" in result.stderr
+        assert outputs[0] != outputs[1]
+        assert outputs[1] == outputs[2]
+
+    def test_export_profile_previous(
+            self,
+            runfolder_ngi_json_file,
+            experiment_set_ngi_json_file,
+    ):
+        # the output is only the profile json, also when reusing a previous export
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as tmpdir:
+            for name, options in [
+                ("first", ["--save-cache"]),
+                ("second", ["--previous", os.path.join(tmpdir, "first"), "--profile", "json"]),
+            ]:
+                outdir = os.path.join(tmpdir, name)
+                os.mkdir(outdir)
+                result = CliRunner().invoke(
+                    metadata.metadata,
+                    ["export", "-o", outdir] + options + [
+                        runfolder_ngi_json_file,
+                        experiment_set_ngi_json_file,
+                        "json",
+                    ]
+                )
+                assert result.exit_code == 0
+        assert json.loads(result.stdout)
+        assert "Reused" in result.stderr
+
+    def test_export_profile(
+        self,
+        runfolder_ngi_json_file,
+        experiment_set_ngi_json_file,
+    ):
+        for profile in ["table", "json"]:
+            with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+                result = CliRunner().invoke(
+                    metadata.metadata,
+                    [
+                        "export",
+                        "-o",
+                        outdir,
+                        "--profile",
+                        profile,
+                        runfolder_ngi_json_file,
+                        experiment_set_ngi_json_file,
+                        "json",
+                    ]
+                )
+            assert result.exit_code == 0
+            assert "ConvertExperimentSet" in result.output
+            if profile == "json":
+                assert json.loads(result.output)
+
 
 class TestExtract:
 
@@ -109,6 +242,97 @@ class TestExtract:
             experiment_set_lims_json_file,
         )
 
+    def test_extract_snpseq_data_stream(
+        self,
+        experiment_set_lims_json_file,
+    ):
+        outputs = []
+        for options in [[], ["--stream"], ["-p", "2"], ["--stream", "-p", "2"]]:
+            with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+                metadata_helper(
+                    metadata.metadata,
+                    ["extract", "snpseq-data", "-o", outdir] + options + [
+                        experiment_set_lims_json_file,
+                        "json",
+                    ]
+                )
+                outfile = os.path.join(
+                    outdir,
+                    os.path.basename(experiment_set_lims_json_file).replace(
+                        ".json", ".ngi.json"
+                    )
+                )
+                with open(outfile) as fh:
+                    outputs.append(fh.read())
+        assert all(output == outputs[0] for output in outputs)
+
+    def test_extract_snpseq_data_multiple_files(
+        self,
+        experiment_set_lims_json_file,
+        experiment_set_lims_json,
+    ):
+        samples = experiment_set_lims_json["result"]["samples"]
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            # split the samples over two files, with one sample present in both
+            snpseq_data_files = []
+            for i, file_samples in enumerate([samples[:5], samples[4:]]):
+                snpseq_data_file = os.path.join(outdir, f"snpseq_data_{i}.json")
+                with open(snpseq_data_file, "w") as fh:
+                    json.dump({"result": {"name": "container", "samples": file_samples}}, fh)
+                snpseq_data_files.append(snpseq_data_file)
+
+            outputs = []
+            for options in [[], ["--stream"]]:
+                metadata_helper(
+                    metadata.metadata,
+                    ["extract", "snpseq-data", "-o", outdir] + options + snpseq_data_files + [
+                        "json",
+                    ]
+                )
+                with open(os.path.join(outdir, "snpseq_data_0.ngi.json")) as fh:
+                    outputs.append(fh.read())
+
+            metadata_helper(
+                metadata.metadata,
+                ["extract", "snpseq-data", "-o", outdir, experiment_set_lims_json_file, "json"]
+            )
+            with open(os.path.join(outdir, "snpseq_data_XYZ321XY.ngi.json")) as fh:
+                expected_output = fh.read()
+        assert outputs == [expected_output, expected_output]
+
+    def test_extract_lims_csv(
+        self,
+        lims_csv_files,
+        experiment_set_ngi_json_file,
+    ):
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            metadata_helper(
+                metadata.metadata,
+                ["extract", "lims-csv", "-o", outdir] + lims_csv_files + ["json"]
+            )
+            outfile = os.path.join(outdir, os.path.basename(experiment_set_ngi_json_file))
+            with open(outfile) as fh:
+                observed_json = json.load(fh)
+        with open(experiment_set_ngi_json_file) as fh:
+            assert observed_json == json.load(fh)
+
+    def test_extract_snpseq_data_validation_report(self, experiment_set_lims_json_file):
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            report_file = os.path.join(outdir, "report.json")
+            metadata_helper(
+                metadata.metadata,
+                [
+                    "extract", "snpseq-data", "-o", outdir,
+                    "--validation-report", report_file,
+                    experiment_set_lims_json_file,
+                    "json"
+                ]
+            )
+            with open(report_file) as fh:
+                report = json.load(fh)
+        assert report["samples"] == 9
+        assert [issue["sample_name"] for issue in report["errors"]] == ["PhiX v3"]
+
     def test_extract_runfolder(
         self,
         runfolder_path,
@@ -117,3 +341,152 @@ class TestExtract:
             "runfolder",
             runfolder_path,
         )
+
+    def test_extract_runfolder_stats(self, runfolder_path):
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            result = runner.invoke(
+                metadata.metadata,
+                ["extract", "runfolder", "-o", outdir, "--stats", runfolder_path, "json"]
+            )
+        assert result.exit_code == 0
+        assert "listdir" in result.output
+        assert "bytes read" in result.output
+
+    def test_extract_runfolders(
+            self,
+            runfolder_path,
+            tmpdir,
+    ):
+        listfile = os.path.join(tmpdir, "runfolders.txt")
+        with open(listfile, "w") as fh:
+            fh.write(f"{runfolder_path}\n")
+            fh.write(f"{os.path.join(tmpdir, '210415_A00001_0124_BNOTEXIST')}\n")
+
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            metadata_helper(
+                metadata.metadata,
+                [
+                    "extract",
+                    "runfolders",
+                    "-o",
+                    outdir,
+                    "-p",
+                    "2",
+                    listfile,
+                    "json",
+                ]
+            )
+            assert os.path.exists(
+                os.path.join(outdir, f"{os.path.basename(runfolder_path)}.ngi.json")
+            )
+            with open(os.path.join(outdir, "runfolders.failures.tsv")) as fh:
+                failures = [line.split("\t")[0] for line in fh][1:]
+            assert failures == [os.path.join(tmpdir, "210415_A00001_0124_BNOTEXIST")]
+
+    def test_extract_runfolders_tar(
+            self,
+            runfolder_path,
+            tmpdir,
+    ):
+        # a root directory of archived runfolders is extracted like one of runfolders
+        runfolder_name = os.path.basename(runfolder_path)
+        root = os.path.join(tmpdir, "archive")
+        os.mkdir(root)
+        with tarfile.open(os.path.join(root, f"{runfolder_name}.tar.gz"), "w:gz") as tar:
+            tar.add(runfolder_path, arcname=runfolder_name)
+
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            metadata_helper(
+                metadata.metadata,
+                ["extract", "runfolders", "-o", outdir, root, "json"]
+            )
+            with open(os.path.join(outdir, f"{runfolder_name}.ngi.json")) as fh:
+                ngi_json = json.load(fh)
+            with open(os.path.join(outdir, "runfolders.failures.tsv")) as fh:
+                assert len(fh.readlines()) == 1
+        assert ngi_json["runfolder_path"] == os.path.join(root, runfolder_name)
+        assert ngi_json["sequencing_runs"]
+
+    def test_extract_runfolders_errors(
+            self,
+            runfolder_path,
+            tmpdir,
+            monkeypatch,
+    ):
+        # errors outside of the parsing of a runfolder fail the runfolder but not the batch
+        broken_path = os.path.join(tmpdir, "210415_A00001_0124_BBROKEN")
+        listfile = os.path.join(tmpdir, "runfolders.txt")
+        with open(listfile, "w") as fh:
+            fh.write(f"{runfolder_path}\n")
+            fh.write(f"{broken_path}\n")
+
+        parse_runfolder = metadata._parse_runfolder
+
+        def _parse_runfolder(path, threads=None):
+            if path == broken_path:
+                raise concurrent.futures.process.BrokenProcessPool("this-is-a-broken-pool")
+            return parse_runfolder(path, threads)
+
+        # the runfolders are parsed in threads, so that the patched parsing is used
+        monkeypatch.setattr(
+            concurrent.futures, "ProcessPoolExecutor", concurrent.futures.ThreadPoolExecutor
+        )
+        monkeypatch.setattr(metadata, "_parse_runfolder", _parse_runfolder)
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            # the output of the runfolder can not be written
+            os.mkdir(os.path.join(outdir, f"{os.path.basename(runfolder_path)}.ngi.json"))
+            result = CliRunner().invoke(
+                metadata.metadata,
+                ["extract", "runfolders", "-o", outdir, listfile, "json"]
+            )
+            assert result.exit_code == 0
+            assert "Extracted 0 of 2 runfolders, 2 failed" in result.output
+            with open(os.path.join(outdir, "runfolders.failures.tsv")) as fh:
+                failures = dict(line.rstrip("\n").split("\t") for line in fh)
+        assert failures[broken_path] == "this-is-a-broken-pool"
+        assert runfolder_path in failures
+
+    def test_extract_runfolder_shards(
+            self,
+            runfolder_path,
+    ):
+        runfolder_name = os.path.basename(runfolder_path)
+        with tempfile.TemporaryDirectory(prefix="test_metadata_") as outdir:
+            shard_files = []
+            for shard in ["1/3", "2/3", "3/3"]:
+                metadata_helper(
+                    metadata.metadata,
+                    [
+                        "extract",
+                        "runfolder",
+                        "-o",
+                        outdir,
+                        "--shard",
+                        shard,
+                        runfolder_path,
+                        "json",
+                    ]
+                )
+                shard_files.append(
+                    os.path.join(
+                        outdir,
+                        f"{runfolder_name}.shard-{shard.replace('/', '-of-')}.ngi.json"
+                    )
+                )
+
+            merged_dir = os.path.join(outdir, "merged")
+            os.mkdir(merged_dir)
+            metadata_helper(
+                metadata.metadata,
+                ["merge", "-o", merged_dir] + shard_files
+            )
+            metadata_helper(
+                metadata.metadata,
+                ["extract", "runfolder", "-o", outdir, runfolder_path, "json"]
+            )
+            with open(os.path.join(merged_dir, f"{runfolder_name}.ngi.json")) as fh:
+                merged_json = json.load(fh)
+            with open(os.path.join(outdir, f"{runfolder_name}.ngi.json")) as fh:
+                unsharded_json = json.load(fh)
+            assert merged_json == unsharded_json
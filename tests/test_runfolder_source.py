@@ -0,0 +1,238 @@
+import os
+import pickle
+import pytest
+import tarfile
+
+import snpseq_metadata.utilities
+from snpseq_metadata.models.ngi_models import NGIFlowcell
+from snpseq_metadata.runfolder_source import (
+    ConcurrentRunfolderSource,
+    ListingRunfolderSource,
+    RunfolderSource,
+    TarRunfolderSource,
+)
+
+
+@pytest.fixture(params=[True, False], ids=["with_top_dir", "without_top_dir"])
+def runfolder_tar(request, runfolder_path, tmpdir):
+    runfolder_name = os.path.basename(runfolder_path)
+    tar_path = os.path.join(tmpdir, f"{runfolder_name}.tar.gz")
+    with tarfile.open(tar_path, "w:gz") as tar:
+        tar.add(
+            runfolder_path,
+            arcname=runfolder_name if request.param else ".",
+        )
+    return tar_path
+
+
+@pytest.fixture
+def runfolder_listing(runfolder_path, tmpdir):
+    listing_file = os.path.join(tmpdir, "listing.tsv")
+    with open(listing_file, "w") as fh:
+        fh.write("# path\tsize\tmtime\tchecksum\n")
+        for dirpath, dirnames, filenames in os.walk(runfolder_path):
+            for filename in filenames:
+                filepath = os.path.join(dirpath, filename)
+                stat = os.stat(filepath)
+                fh.write(
+                    f"{os.path.relpath(filepath, runfolder_path)}\t{stat.st_size}\t"
+                    f"{stat.st_mtime}\n"
+                )
+    return listing_file
+
+
+class TestRunfolderSource:
+    def test_from_path(self, runfolder_path, runfolder_tar):
+        source = RunfolderSource.from_path(runfolder_path)
+        assert type(source) is RunfolderSource
+        assert source.runfolder_path == runfolder_path
+
+        source = RunfolderSource.from_path(runfolder_path, max_workers=4)
+        assert type(source) is ConcurrentRunfolderSource
+        assert source.max_workers == 4
+
+        source = RunfolderSource.from_path(runfolder_tar)
+        assert type(source) is TarRunfolderSource
+        assert source.runfolder_path == os.path.join(
+            os.path.dirname(runfolder_tar), os.path.basename(runfolder_path)
+        )
+
+    def test_lookup_checksum(self, checksum_file, file_checksums):
+        source = RunfolderSource(runfolder_path=os.path.dirname(checksum_file))
+        for testfile, expected_checksum in file_checksums.items():
+            assert source.lookup_checksum(
+                checksumfile=checksum_file, querypath=testfile
+            ) == expected_checksum
+        assert source.lookup_checksum(
+            checksumfile=checksum_file, querypath="this-is-not-in-the-file"
+        ) is None
+
+
+    def test_parse_samplesheet_data_statistics(self, runfolder_path):
+        # the bytes of the samplesheet are counted, unless the parsed data is cached
+        samplesheet = next(
+            os.path.join(runfolder_path, f)
+            for f in os.listdir(runfolder_path)
+            if f.endswith("SampleSheet.csv")
+        )
+        snpseq_metadata.utilities._samplesheet_cache.clear()
+        source = RunfolderSource(runfolder_path=runfolder_path)
+        assert source.parse_samplesheet_data(samplesheet)
+        assert source.statistics.bytes_read == os.path.getsize(samplesheet)
+        assert source.statistics.counts["open"] == 1
+        assert source.parse_samplesheet_data(samplesheet)
+        assert source.statistics.bytes_read == os.path.getsize(samplesheet)
+
+    def test_statistics(self, runfolder_path):
+        flowcell = NGIFlowcell(runfolder_path=runfolder_path)
+        statistics = flowcell.filesystem_statistics
+        assert statistics is flowcell._source.statistics
+        assert statistics.counts["listdir"] > 0
+        assert statistics.counts["open"] > 0
+        assert statistics.bytes_read > 0
+
+        # assert that a listing avoids the directory listings
+        source = ConcurrentRunfolderSource(runfolder_path=runfolder_path)
+        source.prefetch(paths=[runfolder_path])
+        listdir_count = source.statistics.counts["listdir"]
+        source.listdir(runfolder_path)
+        source.isdir(runfolder_path)
+        assert source.statistics.counts["listdir"] == listdir_count
+        assert "isdir" not in source.statistics.counts
+
+
+class TestTarRunfolderSource:
+    def test_listdir(self, runfolder_path, runfolder_tar):
+        source = TarRunfolderSource(tar_path=runfolder_tar)
+        for dirpath, dirnames, filenames in os.walk(runfolder_path):
+            tar_dirpath = os.path.join(
+                source.runfolder_path, os.path.relpath(dirpath, runfolder_path)
+            )
+            assert source.isdir(tar_dirpath)
+            assert sorted(source.listdir(tar_dirpath)) == sorted(dirnames + filenames)
+            for filename in filenames:
+                assert source.exists(os.path.join(tar_dirpath, filename))
+                assert not source.isdir(os.path.join(tar_dirpath, filename))
+        with pytest.raises(FileNotFoundError):
+            source.listdir(os.path.join(source.runfolder_path, "not-a-directory"))
+        source.close()
+
+    def test_calculate_checksum(self, runfolder_path, runfolder_tar):
+        source = TarRunfolderSource(tar_path=runfolder_tar)
+        disk_source = RunfolderSource(runfolder_path=runfolder_path)
+        samplesheet = next(
+            filter(lambda f: f.endswith(".csv"), os.listdir(runfolder_path))
+        )
+        assert source.calculate_checksum(
+            os.path.join(source.runfolder_path, samplesheet), "MD5"
+        ) == disk_source.calculate_checksum(
+            os.path.join(runfolder_path, samplesheet), "MD5"
+        )
+        source.close()
+
+    def test_flowcell_from_tar(self, runfolder_path, runfolder_tar):
+        source = TarRunfolderSource(tar_path=runfolder_tar)
+        flowcell_from_tar = NGIFlowcell(
+            runfolder_path=source.runfolder_path,
+            source=source
+        )
+        flowcell_from_disk = NGIFlowcell(runfolder_path=runfolder_path)
+        flowcell_from_tar.runfolder_path = flowcell_from_disk.runfolder_path
+        assert flowcell_from_tar.to_json() == flowcell_from_disk.to_json()
+        source.close()
+
+    def test_pickle(self, runfolder_path, runfolder_tar):
+        # the open archive is not pickled, but opened again by the unpickled source
+        source = TarRunfolderSource(tar_path=runfolder_tar)
+        flowcell = NGIFlowcell(runfolder_path=source.runfolder_path, source=source)
+        unpickled_source = pickle.loads(pickle.dumps(source))
+        assert unpickled_source.listdir(source.runfolder_path) == \
+            source.listdir(source.runfolder_path)
+        assert pickle.loads(pickle.dumps(flowcell)).to_json() == flowcell.to_json()
+        unpickled_source.close()
+        source.close()
+
+
+class TestListingRunfolderSource:
+    def test_listdir(self, runfolder_path, runfolder_listing):
+        source = ListingRunfolderSource(
+            runfolder_path=runfolder_path, listing_file=runfolder_listing
+        )
+        for dirpath, dirnames, filenames in os.walk(runfolder_path):
+            if not filenames and not dirnames:
+                continue
+            assert source.isdir(dirpath)
+            assert sorted(source.listdir(dirpath)) == sorted(dirnames + filenames)
+            for filename in filenames:
+                assert source.exists(os.path.join(dirpath, filename))
+                assert not source.isdir(os.path.join(dirpath, filename))
+        with pytest.raises(FileNotFoundError):
+            source.listdir(os.path.join(runfolder_path, "not-a-directory"))
+
+    def test_calculate_checksum(self, runfolder_path, tmpdir):
+        listing_file = os.path.join(tmpdir, "listing.tsv")
+        with open(listing_file, "w") as fh:
+            fh.write("Unaligned/a.fastq.gz\t100\t1618444800.0\tthis-is-a-checksum\n")
+            fh.write("Unaligned/b.fastq.gz\t100\t1618444800.0\n")
+        source = ListingRunfolderSource(
+            runfolder_path=runfolder_path, listing_file=listing_file
+        )
+        assert source.calculate_checksum(
+            os.path.join(runfolder_path, "Unaligned", "a.fastq.gz"), "MD5"
+        ) == "this-is-a-checksum"
+        with pytest.raises(FileNotFoundError):
+            source.calculate_checksum(
+                os.path.join(runfolder_path, "Unaligned", "b.fastq.gz"), "MD5"
+            )
+
+    def test_flowcell_from_listing(self, runfolder_path, runfolder_listing, monkeypatch):
+        flowcell_from_disk = NGIFlowcell(runfolder_path=runfolder_path)
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("the file system should not be listed")
+
+        monkeypatch.setattr(os, "listdir", _fail)
+        monkeypatch.setattr(os.path, "isdir", _fail)
+        flowcell_from_listing = NGIFlowcell.from_listing(
+            runfolder_path=runfolder_path, listing_file=runfolder_listing
+        )
+        assert flowcell_from_listing.to_json() == flowcell_from_disk.to_json()
+
+
+class TestConcurrentRunfolderSource:
+    def test_prefetch(self, runfolder_path, monkeypatch):
+        source = ConcurrentRunfolderSource(runfolder_path=runfolder_path, max_workers=4)
+        source.prefetch(
+            paths=[
+                runfolder_path,
+                os.path.join(runfolder_path, "not-a-directory")
+            ]
+        )
+        tree = list(os.walk(runfolder_path))
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("the file system should not be accessed")
+
+        monkeypatch.setattr(os, "scandir", _fail)
+        monkeypatch.setattr(os.path, "isdir", _fail)
+        monkeypatch.setattr(os.path, "exists", _fail)
+        for dirpath, dirnames, filenames in tree:
+            assert source.isdir(dirpath)
+            assert sorted(source.listdir(dirpath)) == sorted(dirnames + filenames)
+            for filename in filenames:
+                assert source.exists(os.path.join(dirpath, filename))
+                assert not source.isdir(os.path.join(dirpath, filename))
+        assert not source.exists(os.path.join(runfolder_path, "not-a-directory"))
+
+    def test_prefetch_max_depth(self, runfolder_path):
+        source = ConcurrentRunfolderSource(runfolder_path=runfolder_path)
+        source.prefetch(paths=[runfolder_path], max_depth=1)
+        assert list(source._listings.keys()) == [os.path.normpath(runfolder_path)]
+
+    def test_flowcell_concurrent(self, runfolder_path):
+        flowcell_from_disk = NGIFlowcell(runfolder_path=runfolder_path)
+        flowcell_concurrent = NGIFlowcell(
+            runfolder_path=runfolder_path,
+            source=ConcurrentRunfolderSource(runfolder_path=runfolder_path, max_workers=4)
+        )
+        assert flowcell_concurrent.to_json() == flowcell_from_disk.to_json()
@@ -1,7 +1,14 @@
+import datetime
+import io
+import json
 import os
+import pickle
 import pytest
 
-from snpseq_metadata.exceptions import SampleSheetNotFoundException
+from snpseq_metadata.exceptions import (
+    NoSampleSheetDataFoundException,
+    SampleSheetNotFoundException,
+)
 import snpseq_metadata.utilities
 
 
@@ -22,6 +29,117 @@ def test_parse_samplesheet_data(samplesheet_file, samplesheet_data):
     )
 
 
+def test_parse_samplesheet_data_v2(tmpdir):
+    samplesheet = os.path.join(tmpdir, "SampleSheet.csv")
+    with open(samplesheet, "w") as fh:
+        fh.write("[Header],\nFileFormatVersion,2\n\n")
+        fh.write("[BCLConvert_Settings],\nAdapterRead1,CTGTCTCTTATACACATCT\n\n")
+        fh.write("[BCLConvert_Data],,\nLane,Sample_ID,Index\n1,S1,ACGT\n2,S2\n\n")
+        fh.write("[Cloud_Data],\nSample_ID,ProjectName\nS1,AB-1234\n")
+    assert snpseq_metadata.utilities.parse_samplesheet_data(samplesheet) == [
+        {"lane": "1", "sample_id": "S1", "index": "ACGT"},
+        {"lane": "2", "sample_id": "S2", "index": None},
+    ]
+
+    with open(samplesheet, "w") as fh:
+        fh.write("[Header],\nFileFormatVersion,2\n")
+    with pytest.raises(NoSampleSheetDataFoundException):
+        snpseq_metadata.utilities.parse_samplesheet_data(samplesheet)
+
+
+def test_parse_samplesheet_data_cached(samplesheet_file, samplesheet_data, monkeypatch):
+    snpseq_metadata.utilities.parse_samplesheet_data(samplesheet_file)
+
+    # assert that an unchanged samplesheet is not parsed again
+    def _fail(*args, **kwargs):
+        raise AssertionError("the samplesheet should not be parsed again")
+
+    monkeypatch.setattr(
+        snpseq_metadata.utilities, "parse_samplesheet_data_from_stream", _fail
+    )
+    obs_data = snpseq_metadata.utilities.parse_samplesheet_data(samplesheet_file)
+    assert obs_data == samplesheet_data
+
+    # assert that modifying the returned data does not affect the cache
+    obs_data[0]["sample_id"] = "this-is-modified"
+    assert snpseq_metadata.utilities.parse_samplesheet_data(samplesheet_file) == \
+        samplesheet_data
+
+    # assert that a modified samplesheet is parsed again
+    stat = os.stat(samplesheet_file)
+    os.utime(samplesheet_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    with pytest.raises(AssertionError):
+        snpseq_metadata.utilities.parse_samplesheet_data(samplesheet_file)
+
+
+def test_parse_run_parameters():
+    # assert that the fields are parsed from separate elements and that parsing stops when all
+    # have been found, i.e. the malformed remainder of the file is never read
+    run_parameters = io.BytesIO(
+        b"<?xml version=\"1.0\"?>\n<RunParameters>"
+        b"<InstrumentType>NovaSeq6000</InstrumentType>"
+        b"<RunStartDate>210415</RunStartDate>"
+        b"<Read1NumberOfCycles>151</Read1NumberOfCycles>"
+        b"<Read2NumberOfCycles>151</Read2NumberOfCycles>"
+        b"<IndexRead1NumberOfCycles>10</IndexRead1NumberOfCycles>"
+        b"<IndexRead2NumberOfCycles>0</IndexRead2NumberOfCycles>"
+        b"<RfidsInfo><FlowCellMode>S4</FlowCellMode></RfidsInfo>"
+        b"<this-is-not-valid-xml"
+    )
+    assert snpseq_metadata.utilities.parse_run_parameters(run_parameters) == {
+        "instrument_type": "NovaSeq6000",
+        "run_start_date": "210415",
+        "read_structure": "151-10-151",
+        "flowcell_mode": "S4",
+    }
+
+    # assert that the read structure is built from the read elements present when their parent
+    # closes, e.g. for a single index run, and that parsing stops when all fields are found
+    run_parameters = io.BytesIO(
+        b"<?xml version=\"1.0\"?>\n<RunParameters>"
+        b"<InstrumentType>NovaSeq6000</InstrumentType>"
+        b"<RunStartDate>210415</RunStartDate>"
+        b"<RfidsInfo><FlowCellMode>S4</FlowCellMode></RfidsInfo>"
+        b"<Setup><Read1NumberOfCycles>151</Read1NumberOfCycles>"
+        b"<IndexRead1NumberOfCycles>10</IndexRead1NumberOfCycles>"
+        b"<Read2NumberOfCycles>151</Read2NumberOfCycles></Setup>"
+        b"<this-is-not-valid-xml"
+    )
+    assert snpseq_metadata.utilities.parse_run_parameters(run_parameters) == {
+        "instrument_type": "NovaSeq6000",
+        "run_start_date": "210415",
+        "read_structure": "151-10-151",
+        "flowcell_mode": "S4",
+    }
+    run_parameters = io.BytesIO(
+        b"<RunParameters><Read1NumberOfCycles>151</Read1NumberOfCycles>"
+        b"<IndexRead1NumberOfCycles>10</IndexRead1NumberOfCycles>"
+        b"<Read2NumberOfCycles>0</Read2NumberOfCycles></RunParameters>"
+    )
+    assert snpseq_metadata.utilities.parse_run_parameters(run_parameters) == {
+        "read_structure": "151-10",
+    }
+
+    # assert that the read structure is parsed from read elements
+    run_parameters = io.BytesIO(
+        b"<RunParameters><InstrumentType>NovaSeqXPlus</InstrumentType>"
+        b"<PlannedReads><Read ReadName=\"Read1\" Cycles=\"151\"/>"
+        b"<Read ReadName=\"Index1\" Cycles=\"10\"/>"
+        b"<Read ReadName=\"Read2\" Cycles=\"151\"/></PlannedReads></RunParameters>"
+    )
+    assert snpseq_metadata.utilities.parse_run_parameters(run_parameters) == {
+        "instrument_type": "NovaSeqXPlus",
+        "read_structure": "151-10-151",
+    }
+
+
+def test_parse_run_date():
+    run_date = datetime.datetime(2021, 4, 15)
+    for datestr in ["210415", "20210415", "2021-04-15T10:11:12Z"]:
+        assert snpseq_metadata.utilities.parse_run_date(datestr) == run_date
+    assert snpseq_metadata.utilities.parse_run_date("this-is-not-a-date") is None
+
+
 def test_find_samplesheet(monkeypatch):
     def _listdir_no_samplesheet(*args):
         return ["file1", "file2", "file3"]
@@ -65,6 +183,53 @@ def test_find_existing_samplesheet(test_resources_path, samplesheet_file):
     ]
 
 
+def test_find_runfolders(tmpdir):
+    pattern = r"^\d{6}_[A-Z]+\d+_\d+_[A-Z0-9]+$"
+    runfolders = [
+        os.path.join(tmpdir, d)
+        for d in ["210415_A00001_0123_BXYZ321XY", "210416_A00001_0124_AXYZ321XZ"]
+    ]
+    for d in runfolders + [os.path.join(tmpdir, "not-a-runfolder")]:
+        os.makedirs(d)
+    # tar archives of runfolders are found as well
+    runfolder_tars = [
+        os.path.join(tmpdir, f)
+        for f in ["210417_A00001_0125_BXYZ321YY.tar", "210418_A00001_0126_BXYZ321YZ.tar.gz"]
+    ]
+    for f in runfolder_tars + [os.path.join(tmpdir, "not-a-runfolder.tar.gz")]:
+        with open(f, "w"):
+            pass
+
+    # assert that runfolders are found in a root directory
+    assert snpseq_metadata.utilities.find_runfolders(str(tmpdir), pattern) == \
+        runfolders + runfolder_tars
+
+    # assert that runfolders are read from a list file
+    listfile = os.path.join(tmpdir, "runfolders.txt")
+    with open(listfile, "w") as fh:
+        fh.write("# a comment\n")
+        fh.write("\n".join(reversed(runfolders)))
+        fh.write("\n\n")
+    assert snpseq_metadata.utilities.find_runfolders(listfile, pattern) == list(
+        reversed(runfolders)
+    )
+
+
+def test_parse_shard():
+    assert snpseq_metadata.utilities.parse_shard("1/4") == (1, 4)
+    assert snpseq_metadata.utilities.parse_shard("4/4") == (4, 4)
+    for shard in ["0/4", "5/4", "1", "a/b", None]:
+        with pytest.raises(ValueError):
+            snpseq_metadata.utilities.parse_shard(shard)
+
+
+def test_shard_for_key():
+    keys = [f"Sample_{i}" for i in range(100)]
+    shards = [snpseq_metadata.utilities.shard_for_key(key, 4) for key in keys]
+    assert set(shards) == {1, 2, 3, 4}
+    assert shards == [snpseq_metadata.utilities.shard_for_key(key, 4) for key in keys]
+
+
 def test_lookup_checksum_from_file(test_resources_path, checksum_file, file_checksums):
 
     # if a checksum file is missing, the method will throw an exception
@@ -81,3 +246,109 @@ def test_lookup_checksum_from_file(test_resources_path, checksum_file, file_chec
             )
             == expected_checksum
         )
+
+
+def test_filesystem_statistics():
+    statistics = snpseq_metadata.utilities.FilesystemStatistics()
+    for _ in range(3):
+        with statistics.measure("listdir"):
+            pass
+    with pytest.raises(ValueError):
+        with statistics.measure("open"):
+            raise ValueError()
+    with statistics.measure_file(io.BytesIO(b"0123456789")) as fh:
+        fh.read(4)
+        fh.read()
+    # text is counted in bytes, not characters
+    with statistics.measure_file(
+            io.BytesIO("röw1\nröw2\n".encode("utf-8")), text=True, encoding="utf-8"
+    ) as fh:
+        assert list(fh) == ["röw1\n", "röw2\n"]
+
+    assert statistics.counts == {"listdir": 3, "open": 1}
+    assert statistics.bytes_read == 22
+    assert set(statistics.to_json()["operations"].keys()) == {"listdir", "open"}
+    assert "listdir" in statistics.report()
+
+    # assert that the statistics can be pickled, e.g. to be passed between processes
+    assert pickle.loads(pickle.dumps(statistics)).to_json() == statistics.to_json()
+
+
+def test_iter_json_array():
+    doc = {
+        "number": 1.2345e10,
+        "result": {
+            "name": "this-is-a-name",
+            "other": [1, {"string": "]},["}],
+            "samples": [{"index": i, "value": -1.5e-3} for i in range(10)],
+            "trailing": None,
+        }
+    }
+    for indent in [None, 2]:
+        for chunk_size in [1, 7, 1024]:
+            fh = io.StringIO(json.dumps(doc, indent=indent))
+            assert list(
+                snpseq_metadata.utilities.iter_json_array(
+                    fh, keys=["result", "samples"], chunk_size=chunk_size
+                )
+            ) == doc["result"]["samples"]
+
+    # assert that missing or empty arrays yield nothing
+    for text in ['{"result": {}}', '{"result": {"samples": []}}', '{}']:
+        assert list(
+            snpseq_metadata.utilities.iter_json_array(
+                io.StringIO(text), keys=["result", "samples"]
+            )
+        ) == []
+
+    # assert that a document truncated within the array raises an exception
+    text = json.dumps(doc)
+    with pytest.raises(ValueError):
+        list(
+            snpseq_metadata.utilities.iter_json_array(
+                io.StringIO(text[:text.index('"index": 5') + 4]), keys=["result", "samples"]
+            )
+        )
+
+
+def test_parse_csv_value():
+    for value, expected in {
+        "1": 1,
+        "-431": -431,
+        "0.5": 0.5,
+        "1e3": 1000.0,
+        "true": True,
+        "false": False,
+        "": "",
+        "0123": "0123",
+        "151 pM": "151 pM",
+        "2-2271": "2-2271",
+        "True": "True",
+    }.items():
+        parsed = snpseq_metadata.utilities.parse_csv_value(value)
+        assert parsed == expected and type(parsed) is type(expected)
+
+
+def test_iter_csv_records():
+    text = "\n".join([
+        "sample_name,sample-1",
+        "",
+        "udf_id,2-1234",
+        "checksums,abc,def",
+        "empty,",
+        "sample_name,sample-2",
+        "udf_id,2-5678",
+    ])
+    assert list(snpseq_metadata.utilities.iter_csv_records(io.StringIO(text))) == [
+        {"sample_name": "sample-1", "udf_id": "2-1234", "checksums": ["abc", "def"], "empty": ""},
+        {"sample_name": "sample-2", "udf_id": "2-5678"},
+    ]
+    assert list(snpseq_metadata.utilities.iter_csv_records(io.StringIO(""))) == []
+
+
+def test_intern_value():
+    value = "".join(["this-is-", "a-value"])
+    assert snpseq_metadata.utilities.intern_value(value) is \
+        snpseq_metadata.utilities.intern_value("this-is-a-value")
+    for value in [None, 1, 1.5, True, ["a", "list"]]:
+        assert snpseq_metadata.utilities.intern_value(value) is value